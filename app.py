@@ -10,16 +10,36 @@ Date: January 9, 2026
 
 """
 
-from flask import Flask, jsonify, request, send_file, send_from_directory, redirect, session, url_for
+# gevent tem de fazer monkey-patch antes de qualquer outro import
+try:
+    from gevent import monkey, get_hub
+    monkey.patch_all()
+    GEVENT_ENABLED = True
+except ImportError:
+    GEVENT_ENABLED = False
+
+from flask import Flask, Response, g, jsonify, make_response, request, send_file, send_from_directory, redirect, session, url_for
 from flask_cors import CORS
-from icalendar import Calendar, Event
 import os
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import subprocess
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
+import atexit
+import hmac
+import html
 import json
+import queue
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from calendar_common import (
+    MANUAL_CALENDAR_EPILOG, MANUAL_CALENDAR_PROLOG, OrjsonProvider,
+    format_manual_event, ics_unescape, write_file_atomic
+)
 
 # ============================================================================
 # CONFIGURATION
@@ -27,7 +47,9 @@ import json
 
 load_dotenv()
 
-app = Flask(__name__, static_folder='static', static_url_path='/static')
+# Sem rota estática automática: /static é servido por serve_static (com auth)
+app = Flask(__name__, static_folder=None)
+app.json = OrjsonProvider(app)
 CORS(app)
 
 # ⭐ IMPORTANTE: Usar FLASK_SECRET_KEY (sem expor valor real!)
@@ -42,118 +64,259 @@ CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'localhost,127.0.0.1')
 # Credenciais de login - valores vêm de environment, não do código!
 ADMIN_USERNAME = os.getenv('WEB_USERNAME', 'admin')
 ADMIN_PASSWORD = os.getenv('WEB_PASSWORD', 'admin123')
+ADMIN_USER_BYTES = ADMIN_USERNAME.encode('utf-8')
+ADMIN_PASS_BYTES = ADMIN_PASSWORD.encode('utf-8')
+
+# Sessões
+app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=24)
+
+# Sessões em Redis (opcional) - partilhadas entre workers e revogáveis no logout
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    import redis
+    from flask_session import Session
+    
+    app.config['SESSION_TYPE'] = 'redis'
+    app.config['SESSION_REDIS'] = redis.from_url(REDIS_URL)
+    app.config['SESSION_USE_SIGNER'] = True
+    Session(app)
 
 # File paths
-IMPORT_CALENDAR_PATH = os.path.join(REPO_PATH, 'import_calendar.ics')
-MASTER_CALENDAR_PATH = os.path.join(REPO_PATH, 'master_calendar.ics')
-MANUAL_CALENDAR_PATH = os.path.join(REPO_PATH, 'manual_calendar.ics')
-SYNC_SCRIPT_PATH = os.path.join(REPO_PATH, 'sync_calendars.py')
+REPO_DIR = Path(REPO_PATH)
+IMPORT_CALENDAR_PATH = REPO_DIR / 'import_calendar.ics'
+MASTER_CALENDAR_PATH = REPO_DIR / 'master_calendar.ics'
+MANUAL_CALENDAR_PATH = REPO_DIR / 'manual_calendar.ics'
+SYNC_SCRIPT_PATH = REPO_DIR / 'sync_calendars.py'
+LOG_FILE_PATH = REPO_DIR / 'sync.log'
+STATIC_DIR = Path(__file__).parent / 'static'
+MANUAL_CALENDAR_HTML = STATIC_DIR / 'manual_calendar.html'
+
+# Ficheiros estáticos servidos sem autenticação
+PUBLIC_STATIC_FILES = frozenset({'login.html', 'css/login.css', 'css/style.css', 'js/login.js'})
+
+# Jobs de sincronização em background: {job_id: {'future': Future, 'started': datetime}}
+_SYNC_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+_SYNC_JOBS = {}
+_SYNC_JOBS_LOCK = threading.Lock()
+SYNC_JOB_TTL = timedelta(hours=1)
+
+# Calendários devolvidos por /api/calendar/all
+CALENDAR_FILES = {
+    'master': MASTER_CALENDAR_PATH,
+    'import': IMPORT_CALENDAR_PATH,
+    'manual': MANUAL_CALENDAR_PATH
+}
+_CALENDAR_POOL = ThreadPoolExecutor(max_workers=len(CALENDAR_FILES))
+
+class HubSafeQueueListener(QueueListener):
+    """QueueListener whose monitor runs on a native thread under gevent
+    
+    With monkey-patching threading.Thread is a greenlet, so the handlers'
+    file/stderr writes would still block the hub; the hub threadpool runs
+    real OS threads (the same place run_blocking sends disk work).
+    """
+    
+    def start(self):
+        if not GEVENT_ENABLED:
+            return super().start()
+        pool = get_hub().threadpool
+        pool.maxsize += 1  # thread dedicada: run_blocking mantém a capacidade
+        self._thread = pool.spawn(self._monitor)
+    
+    def stop(self):
+        if not GEVENT_ENABLED:
+            return super().stop()
+        self.enqueue_sentinel()
+        self._thread.get()
+        self._thread = None
 
-# Logging
+# Logging - os pedidos só enfileiram; a escrita em disco/stderr é feita
+# por um QueueListener numa thread nativa. A fila é a SimpleQueue original
+# (C, segura entre threads nativas), não a versão gevent do monkey-patch
+if GEVENT_ENABLED:
+    _log_queue = monkey.get_original('queue', 'SimpleQueue')()
+else:
+    _log_queue = queue.SimpleQueue()
+_log_formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] %(message)s')
+_log_handlers = [logging.FileHandler(LOG_FILE_PATH), logging.StreamHandler()]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+
+# O QueueHandler só passa a mensagem; o formato é aplicado pelos handlers do listener
 logging.basicConfig(
     level=logging.INFO,
-    format='[%(asctime)s] [%(levelname)s] %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(REPO_PATH, 'sync.log')),
-        logging.StreamHandler()
-    ]
+    format='%(message)s',
+    handlers=[QueueHandler(_log_queue)]
 )
 
+_log_listener = HubSafeQueueListener(_log_queue, *_log_handlers)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logger = logging.getLogger(__name__)
 
+# Cache de ficheiros ICS já processados: {filepath: (mtime_ns, size, events)}
+_ICS_CACHE = {}
+_ICS_CACHE_LOCK = threading.Lock()
+
+# Propriedades VEVENT extraídas por read_ics_file
+ICS_EVENT_FIELDS = ('UID', 'SUMMARY', 'DTSTART', 'DTEND', 'DESCRIPTION', 'CATEGORIES', 'STATUS')
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
-def log_info(msg):
-    """Log info message"""
-    logger.info(msg)
-    print(f"[INFO] {msg}")
-
-def log_error(msg):
-    """Log error message"""
-    logger.error(msg)
-    print(f"[ERROR] {msg}")
-
-def file_exists(filepath):
-    """Check if file exists"""
-    return os.path.isfile(filepath)
-
 def is_authenticated():
     """Check if user is authenticated"""
     return session.get('authenticated', False)
 
+def invalidate_ics_cache(filepath):
+    """Drop cached events for an ICS file"""
+    with _ICS_CACHE_LOCK:
+        _ICS_CACHE.pop(filepath, None)
+
+def ics_parse_date(value):
+    """Convert ICS DATE / DATE-TIME value to date/datetime"""
+    try:
+        if len(value) == 8:
+            return datetime.strptime(value, '%Y%m%d').date()
+        if value.endswith('Z'):
+            return datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+        return datetime.strptime(value, '%Y%m%dT%H%M%S')
+    except ValueError:
+        return value
+
+def unfold_ics_lines(lines):
+    """Yield logical ICS lines, joining folded continuations (RFC 5545 3.1)"""
+    current = None
+    for raw in lines:
+        line = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+        if line[:1] in (' ', '\t'):
+            if current is not None:
+                current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+def iter_ics_vevents(lines):
+    """Yield raw {PROPERTY: value} dicts for each VEVENT in ICS lines"""
+    props = None
+    depth = 0
+    
+    for line in unfold_ics_lines(lines):
+        name, _, value = line.partition(':')
+        name = name.split(';', 1)[0].upper()
+        
+        if name == 'BEGIN':
+            if props is not None:
+                depth += 1  # VALARM e afins - ignorar
+            elif value.upper() == 'VEVENT':
+                props = {}
+        elif name == 'END':
+            if depth:
+                depth -= 1
+            elif props is not None and value.upper() == 'VEVENT':
+                yield props
+                props = None
+        elif props is not None and not depth and name in ICS_EVENT_FIELDS:
+            props[name] = value
+
+def run_blocking(func, *args):
+    """Run blocking disk work off the gevent hub (direct call without gevent)"""
+    if GEVENT_ENABLED:
+        return get_hub().threadpool.apply(func, args)
+    return func(*args)
+
+def parse_ics_events(filepath):
+    """Parse VEVENTs of an ICS file into API event dicts"""
+    events = []
+    with open(filepath, 'rb') as f:
+        for props in iter_ics_vevents(f):
+            dtstart = props.get('DTSTART')
+            dtend = props.get('DTEND')
+            
+            events.append({
+                'uid': props.get('UID', ''),
+                'summary': ics_unescape(props.get('SUMMARY', '')),
+                'dtstart': ics_parse_date(dtstart) if dtstart else None,
+                'dtend': ics_parse_date(dtend) if dtend else None,
+                'description': ics_unescape(props.get('DESCRIPTION', '')),
+                'categories': ics_unescape(props.get('CATEGORIES', '')),
+                'status': props.get('STATUS', 'CONFIRMED')
+            })
+    return events
+
 def read_ics_file(filepath):
-    """Read and parse ICS file"""
+    """Read and parse ICS file (cached by mtime and size)"""
     try:
-        if not file_exists(filepath):
+        try:
+            st = os.stat(filepath)
+        except FileNotFoundError:
             return None
         
-        with open(filepath, 'rb') as f:
-            cal = Calendar.from_ical(f.read())
-            events = []
-            
-            for component in cal.walk():
-                if component.name == "VEVENT":
-                    event = {
-                        'uid': str(component.get('uid', '')),
-                        'summary': str(component.get('summary', '')),
-                        'dtstart': component.get('dtstart'),
-                        'dtend': component.get('dtend'),
-                        'description': str(component.get('description', '')),
-                        'categories': str(component.get('categories', '')),
-                        'status': str(component.get('status', 'CONFIRMED'))
-                    }
-                    
-                    # Convert dates to strings
-                    if event['dtstart']:
-                        event['dtstart'] = event['dtstart'].dt.isoformat() if hasattr(event['dtstart'].dt, 'isoformat') else str(event['dtstart'].dt)
-                    if event['dtend']:
-                        event['dtend'] = event['dtend'].dt.isoformat() if hasattr(event['dtend'].dt, 'isoformat') else str(event['dtend'].dt)
-                    
-                    events.append(event)
-            
-            return events
+        with _ICS_CACHE_LOCK:
+            cached = _ICS_CACHE.get(filepath)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        
+        events = run_blocking(parse_ics_events, filepath)
+        
+        with _ICS_CACHE_LOCK:
+            _ICS_CACHE[filepath] = (st.st_mtime_ns, st.st_size, events)
+        
+        return events
     
     except Exception as e:
-        log_error(f"Error reading ICS file {filepath}: {str(e)}")
+        logger.error(f"Error reading ICS file {filepath}: {str(e)}")
+        return None
+
+def calendar_etag(filepath):
+    """ETag derived from file mtime and size (None if file is missing)"""
+    try:
+        st = os.stat(filepath)
+    except OSError:
         return None
+    return f'{st.st_mtime_ns:x}-{st.st_size:x}'
+
+def with_etag(response, etag):
+    """Attach ETag and force revalidation on every poll"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def not_modified(etag):
+    """304 for a conditional poll, echoing the ETag/Cache-Control a 200 would carry"""
+    return with_etag(make_response('', 304), etag)
 
 def save_manual_events(events):
     """Save manual events to manual_calendar.ics"""
     try:
-        cal = Calendar()
-        cal.add('prodid', '-//Rental Manual Calendar//PT')
-        cal.add('version', '2.0')
-        cal.add('calscale', 'GREGORIAN')
-        cal.add('x-wr-calname', 'Manual Calendar Events')
-        cal.add('x-wr-timezone', 'Europe/Lisbon')
-        
-        for event_data in events:
-            event = Event()
-            event.add('summary', event_data.get('summary', 'Manual Event'))
-            event.add('dtstart', event_data.get('dtstart'))
-            event.add('dtend', event_data.get('dtend'))
-            event.add('uid', event_data.get('uid', f"manual-{datetime.now().timestamp()}@rental-calendar.com"))
-            event.add('categories', event_data.get('categories', 'MANUAL'))
-            event.add('description', event_data.get('description', ''))
-            event.add('status', event_data.get('status', 'CONFIRMED'))
-            event.add('transp', 'TRANSPARENT')
-            event.add('created', datetime.now())
-            
-            cal.add_component(event)
+        created = f'{datetime.now():%Y%m%dT%H%M%S}'
+        
+        parts = [MANUAL_CALENDAR_PROLOG]
+        parts.extend(format_manual_event(event_data, created) for event_data in events)
+        parts.append(MANUAL_CALENDAR_EPILOG)
         
         # Write to file
-        with open(MANUAL_CALENDAR_PATH, 'wb') as f:
-            f.write(cal.to_ical())
+        write_file_atomic(MANUAL_CALENDAR_PATH, b''.join(parts))
+        
+        invalidate_ics_cache(MANUAL_CALENDAR_PATH)
         
-        log_info(f"Saved {len(events)} manual events to {MANUAL_CALENDAR_PATH}")
+        logger.info(f"Saved {len(events)} manual events to {MANUAL_CALENDAR_PATH}")
         return True
     
     except Exception as e:
-        log_error(f"Error saving manual events: {str(e)}")
+        logger.error(f"Error saving manual events: {str(e)}")
         return False
 
+@app.before_request
+def stamp_request():
+    """Capture one timestamp per request for response bodies"""
+    g.now = datetime.now()
+
 # ============================================================================
 # AUTHENTICATION ROUTES
 # ============================================================================
@@ -178,21 +341,22 @@ def login_page():
         username = request.form.get('username', '')
         password = request.form.get('password', '')
         
-        # Validar credenciais
-        if username == ADMIN_USERNAME and password == ADMIN_PASSWORD:
+        # Validar credenciais (comparação em tempo constante)
+        user_ok = hmac.compare_digest(username.encode('utf-8'), ADMIN_USER_BYTES)
+        pass_ok = hmac.compare_digest(password.encode('utf-8'), ADMIN_PASS_BYTES)
+        if user_ok and pass_ok:
             # ✅ Login bem-sucedido
             session['authenticated'] = True
             session['username'] = username
             session.permanent = True
-            app.permanent_session_lifetime = timedelta(hours=24)
             
-            log_info(f"✅ User '{username}' logged in successfully")
+            logger.info(f"✅ User '{username}' logged in successfully")
             
             # ⭐ Redirecionar para /manual_calendar
             return redirect(url_for('manual_calendar'))
         else:
             # ❌ Login falhou
-            log_error(f"❌ Failed login attempt for user '{username}'")
+            logger.error(f"❌ Failed login attempt for user '{username}'")
             return login_html(error="Utilizador ou password incorretos"), 401
     
     # GET - mostrar página de login
@@ -204,7 +368,7 @@ def logout():
     username = session.get('username', 'unknown')
     session.clear()
     
-    log_info(f"User '{username}' logged out")
+    logger.info(f"User '{username}' logged out")
     
     return redirect(url_for('login_page'))
 
@@ -221,31 +385,30 @@ def manual_calendar():
         return redirect(url_for('login_page'))
     
     try:
-        static_path = os.path.join(os.path.dirname(__file__), 'static', 'manual_calendar.html')
-        if os.path.exists(static_path):
-            return send_file(static_path)
+        if MANUAL_CALENDAR_HTML.is_file():
+            return send_file(MANUAL_CALENDAR_HTML)
         else:
             return jsonify({
                 'status': 'error',
                 'message': 'HTML file not found at /static/manual_calendar.html'
             }), 404
     except Exception as e:
-        log_error(f"Error serving manual_calendar: {str(e)}")
+        logger.error(f"Error serving manual_calendar: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @app.route('/static/<path:filename>')
 def serve_static(filename):
     """Serve static files - protegido por autenticação"""
     # ⭐ Proteger ficheiros estáticos (exceto login)
-    public_files = ['login.html', 'css/login.css', 'css/style.css', 'js/login.js']
+    is_public = filename in PUBLIC_STATIC_FILES
     
-    if not is_authenticated() and filename not in public_files:
+    if not is_public and not is_authenticated():
         return redirect(url_for('login_page'))
     
     try:
-        return send_from_directory('static', filename)
+        return send_from_directory(STATIC_DIR, filename, max_age=3600 if is_public else None)
     except Exception as e:
-        log_info(f"Static file not found: {filename}")
+        logger.info(f"Static file not found: {filename}")
         return jsonify({'status': 'error', 'message': f'File not found: {filename}'}), 404
 
 # ============================================================================
@@ -257,7 +420,7 @@ def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': g.now,
         'environment': FLASK_ENV,
         'version': '3.1.2',
         'authenticated': is_authenticated()
@@ -269,57 +432,115 @@ def auth_status():
     return jsonify({
         'authenticated': is_authenticated(),
         'username': session.get('username', None),
-        'timestamp': datetime.now().isoformat()
+        'timestamp': g.now
     }), 200
 
+def run_sync_script():
+    """Run sync script and return the job result (background)"""
+    try:
+        result = subprocess.run(
+            [sys.executable, SYNC_SCRIPT_PATH],
+            cwd=REPO_PATH,
+            capture_output=True,
+            text=True,
+            timeout=300
+        )
+    except subprocess.TimeoutExpired:
+        logger.error("Sync script timeout")
+        return {'status': 'error', 'message': 'Synchronization timeout'}
+    except Exception as e:
+        logger.error(f"Sync error: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
+    
+    if result.returncode != 0:
+        logger.error(f"Sync script error: {result.stderr}")
+        return {
+            'status': 'error',
+            'message': 'Synchronization failed',
+            'error': result.stderr
+        }
+    
+    logger.info("Calendar synchronization completed successfully")
+    return {
+        'status': 'success',
+        'message': 'Synchronization completed',
+        'finished_at': datetime.now()
+    }
+
+def prune_sync_jobs():
+    """Forget finished sync jobs older than SYNC_JOB_TTL"""
+    cutoff = datetime.now() - SYNC_JOB_TTL
+    with _SYNC_JOBS_LOCK:
+        for job_id in [j for j, job in _SYNC_JOBS.items() if job['future'].done() and job['started'] < cutoff]:
+            del _SYNC_JOBS[job_id]
+
 @app.route('/api/calendar/sync', methods=['GET', 'POST'])
 def sync_calendars():
-    """Execute calendar synchronization"""
+    """Start calendar synchronization in background"""
     if not is_authenticated():
         return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
     
     try:
-        log_info("Starting calendar synchronization...")
-        
-        if not file_exists(SYNC_SCRIPT_PATH):
+        if not SYNC_SCRIPT_PATH.is_file():
             return jsonify({
                 'status': 'error',
                 'message': f'Sync script not found: {SYNC_SCRIPT_PATH}'
             }), 404
         
-        result = subprocess.run(
-            [f'python {SYNC_SCRIPT_PATH}'],
-            shell=True,
-            cwd=REPO_PATH,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-        
-        if result.returncode != 0:
-            log_error(f"Sync script error: {result.stderr}")
-            return jsonify({
-                'status': 'error',
-                'message': 'Synchronization failed',
-                'error': result.stderr
-            }), 500
+        prune_sync_jobs()
         
-        log_info("Calendar synchronization completed successfully")
+        with _SYNC_JOBS_LOCK:
+            # Reutilizar job em curso em vez de enfileirar outro
+            running = next((j for j, job in _SYNC_JOBS.items() if not job['future'].done()), None)
+            if running:
+                job_id = running
+                message = 'Synchronization already running'
+            else:
+                logger.info("Starting calendar synchronization...")
+                job_id = uuid.uuid4().hex
+                _SYNC_JOBS[job_id] = {
+                    'future': _SYNC_EXECUTOR.submit(run_sync_script),
+                    'started': g.now
+                }
+                message = 'Synchronization started'
         
         return jsonify({
-            'status': 'success',
-            'message': 'Synchronization completed',
-            'timestamp': datetime.now().isoformat()
-        }), 200
-    
-    except subprocess.TimeoutExpired:
-        log_error("Sync script timeout")
-        return jsonify({'status': 'error', 'message': 'Synchronization timeout'}), 500
+            'status': 'accepted',
+            'message': message,
+            'job_id': job_id,
+            'status_url': url_for('sync_status', job_id=job_id),
+            'timestamp': g.now
+        }), 202
     
     except Exception as e:
-        log_error(f"Sync error: {str(e)}")
+        logger.error(f"Sync error: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/calendar/sync/status/<job_id>', methods=['GET'])
+def sync_status(job_id):
+    """Get status of a background synchronization job"""
+    if not is_authenticated():
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    
+    with _SYNC_JOBS_LOCK:
+        job = _SYNC_JOBS.get(job_id)
+    
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Sync job not found'}), 404
+    
+    response = {
+        'job_id': job_id,
+        'started_at': job['started'],
+        'timestamp': g.now
+    }
+    
+    if not job['future'].done():
+        response['status'] = 'running'
+        return jsonify(response), 200
+    
+    response.update(job['future'].result())
+    return jsonify(response), 200 if response['status'] == 'success' else 500
+
 @app.route('/api/calendar/master', methods=['GET'])
 def load_master_calendar():
     """Load master_calendar.ics"""
@@ -327,25 +548,29 @@ def load_master_calendar():
         return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
     
     try:
-        if not file_exists(MASTER_CALENDAR_PATH):
+        etag = calendar_etag(MASTER_CALENDAR_PATH)
+        if etag is None:
             return jsonify({
                 'status': 'error',
                 'message': 'Master calendar not found',
                 'events': []
             }), 404
         
+        if request.if_none_match.contains(etag):
+            return not_modified(etag)
+        
         events = read_ics_file(MASTER_CALENDAR_PATH)
         
-        return jsonify({
+        return with_etag(jsonify({
             'status': 'success',
             'file': 'master_calendar.ics',
             'events': events or [],
             'count': len(events) if events else 0,
-            'timestamp': datetime.now().isoformat()
-        }), 200
+            'timestamp': g.now
+        }), etag), 200
     
     except Exception as e:
-        log_error(f"Error loading master calendar: {str(e)}")
+        logger.error(f"Error loading master calendar: {str(e)}")
         return jsonify({
             'status': 'error',
             'message': str(e),
@@ -359,25 +584,29 @@ def load_import_calendar():
         return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
     
     try:
-        if not file_exists(IMPORT_CALENDAR_PATH):
+        etag = calendar_etag(IMPORT_CALENDAR_PATH)
+        if etag is None:
             return jsonify({
                 'status': 'error',
                 'message': 'Import calendar not found',
                 'events': []
             }), 404
         
+        if request.if_none_match.contains(etag):
+            return not_modified(etag)
+        
         events = read_ics_file(IMPORT_CALENDAR_PATH)
         
-        return jsonify({
+        return with_etag(jsonify({
             'status': 'success',
             'file': 'import_calendar.ics',
             'events': events or [],
             'count': len(events) if events else 0,
-            'timestamp': datetime.now().isoformat()
-        }), 200
+            'timestamp': g.now
+        }), etag), 200
     
     except Exception as e:
-        log_error(f"Error loading import calendar: {str(e)}")
+        logger.error(f"Error loading import calendar: {str(e)}")
         return jsonify({
             'status': 'error',
             'message': str(e),
@@ -391,34 +620,93 @@ def load_manual_calendar():
         return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
     
     try:
-        if not file_exists(MANUAL_CALENDAR_PATH):
+        etag = calendar_etag(MANUAL_CALENDAR_PATH)
+        if etag is None:
             return jsonify({
                 'status': 'success',
                 'file': 'manual_calendar.ics',
                 'events': [],
                 'count': 0,
                 'message': 'No manual events yet',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': g.now
             }), 200
         
+        if request.if_none_match.contains(etag):
+            return not_modified(etag)
+        
         events = read_ics_file(MANUAL_CALENDAR_PATH)
         
-        return jsonify({
+        return with_etag(jsonify({
             'status': 'success',
             'file': 'manual_calendar.ics',
             'events': events or [],
             'count': len(events) if events else 0,
-            'timestamp': datetime.now().isoformat()
-        }), 200
+            'timestamp': g.now
+        }), etag), 200
     
     except Exception as e:
-        log_error(f"Error loading manual calendar: {str(e)}")
+        logger.error(f"Error loading manual calendar: {str(e)}")
         return jsonify({
             'status': 'error',
             'message': str(e),
             'events': []
         }), 500
 
+@app.route('/api/calendar/all', methods=['GET'])
+def load_all_calendars():
+    """Load master, import and manual calendars in one request"""
+    if not is_authenticated():
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    
+    try:
+        # Os três ficheiros são lidos/processados em paralelo
+        futures = {
+            name: _CALENDAR_POOL.submit(read_ics_file, filepath)
+            for name, filepath in CALENDAR_FILES.items()
+        }
+        
+        calendars = {}
+        for name, filepath in CALENDAR_FILES.items():
+            events = futures[name].result()
+            calendars[name] = {
+                'file': filepath.name,
+                'exists': events is not None,
+                'events': events or [],
+                'count': len(events) if events else 0
+            }
+        
+        return jsonify({
+            'status': 'success',
+            'calendars': calendars,
+            'timestamp': g.now
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Error loading calendars: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/calendar/mtimes', methods=['GET'])
+def calendar_mtimes():
+    """Modification times (ns) of the calendar files - 0 if missing"""
+    if not is_authenticated():
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    
+    mtimes = {}
+    for name, filepath in CALENDAR_FILES.items():
+        try:
+            mtimes[name] = os.stat(filepath).st_mtime_ns
+        except OSError:
+            mtimes[name] = 0
+    
+    return jsonify({
+        'status': 'success',
+        'mtimes': mtimes,
+        'timestamp': g.now
+    }), 200
+
 @app.route('/api/calendar/save-manual', methods=['POST'])
 def save_manual_calendar():
     """Save manual events"""
@@ -456,11 +744,11 @@ def save_manual_calendar():
             'status': 'success',
             'message': 'Manual events saved',
             'events_saved': len(events),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': g.now
         }), 200
     
     except Exception as e:
-        log_error(f"Error saving manual calendar: {str(e)}")
+        logger.error(f"Error saving manual calendar: {str(e)}")
         return jsonify({
             'status': 'error',
             'message': str(e)
@@ -473,44 +761,36 @@ def calendar_status():
         return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
     
     try:
-        status = {
-            'import_calendar': {
-                'exists': file_exists(IMPORT_CALENDAR_PATH),
-                'path': IMPORT_CALENDAR_PATH
-            },
-            'master_calendar': {
-                'exists': file_exists(MASTER_CALENDAR_PATH),
-                'path': MASTER_CALENDAR_PATH
-            },
-            'manual_calendar': {
-                'exists': file_exists(MANUAL_CALENDAR_PATH),
-                'path': MANUAL_CALENDAR_PATH
-            },
-            'sync_script': {
-                'exists': file_exists(SYNC_SCRIPT_PATH),
-                'path': SYNC_SCRIPT_PATH
+        status = {}
+        for key, filepath in (
+            ('import_calendar', IMPORT_CALENDAR_PATH),
+            ('master_calendar', MASTER_CALENDAR_PATH),
+            ('manual_calendar', MANUAL_CALENDAR_PATH),
+            ('sync_script', SYNC_SCRIPT_PATH)
+        ):
+            # Um único stat() dá existência e tamanho
+            try:
+                size = filepath.stat().st_size
+            except OSError:
+                status[key] = {'exists': False, 'path': str(filepath)}
+                continue
+            
+            status[key] = {
+                'exists': True,
+                'path': str(filepath),
+                'size_bytes': size,
+                'size_kb': round(size / 1024, 2)
             }
-        }
-        
-        # Get file sizes if they exist
-        for key in status:
-            if status[key]['exists']:
-                try:
-                    size = os.path.getsize(status[key]['path'])
-                    status[key]['size_bytes'] = size
-                    status[key]['size_kb'] = round(size / 1024, 2)
-                except:
-                    pass
         
         return jsonify({
             'status': 'success',
             'repo_path': REPO_PATH,
             'files': status,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': g.now
         }), 200
     
     except Exception as e:
-        log_error(f"Error getting status: {str(e)}")
+        logger.error(f"Error getting status: {str(e)}")
         return jsonify({
             'status': 'error',
             'message': str(e)
@@ -537,16 +817,24 @@ def export_calendar():
                 'message': 'Invalid calendar type'
             }), 400
         
-        if not file_exists(filepath):
+        if not filepath.is_file():
             return jsonify({
                 'status': 'error',
                 'message': f'{calendar_type} calendar not found'
             }), 404
         
-        return send_file(filepath, as_attachment=True, download_name=f'{calendar_type}_calendar.ics')
+        # Pedidos repetidos com If-None-Match / If-Modified-Since recebem 304
+        return send_file(
+            filepath,
+            as_attachment=True,
+            download_name=f'{calendar_type}_calendar.ics',
+            conditional=True,
+            etag=True,
+            max_age=60
+        )
     
     except Exception as e:
-        log_error(f"Error exporting calendar: {str(e)}")
+        logger.error(f"Error exporting calendar: {str(e)}")
         return jsonify({
             'status': 'error',
             'message': str(e)
@@ -576,11 +864,7 @@ def server_error(error):
 # HTML TEMPLATES
 # ============================================================================
 
-def login_html(error=None):
-    """Página de login HTML"""
-    error_msg = f'<div class="error-message">{error}</div>' if error else ''
-    
-    return f'''
+LOGIN_TEMPLATE = '''
     <!DOCTYPE html>
     <html lang="pt">
     <head>
@@ -588,45 +872,45 @@ def login_html(error=None):
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>🔐 Login - Calendar Management</title>
         <style>
-            * {{
+            * {
                 margin: 0;
                 padding: 0;
                 box-sizing: border-box;
-            }}
+            }
             
-            body {{
+            body {
                 font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
                 background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
                 min-height: 100vh;
                 display: flex;
                 align-items: center;
                 justify-content: center;
-            }}
+            }
             
-            .login-container {{
+            .login-container {
                 background: white;
                 border-radius: 12px;
                 box-shadow: 0 10px 40px rgba(0, 0, 0, 0.2);
                 padding: 40px;
                 width: 100%;
                 max-width: 400px;
-            }}
+            }
             
-            h1 {{
+            h1 {
                 text-align: center;
                 color: #333;
                 margin-bottom: 10px;
                 font-size: 28px;
-            }}
+            }
             
-            .subtitle {{
+            .subtitle {
                 text-align: center;
                 color: #666;
                 margin-bottom: 30px;
                 font-size: 14px;
-            }}
+            }
             
-            .error-message {{
+            .error-message {
                 background: #fee;
                 border: 1px solid #fcc;
                 border-radius: 6px;
@@ -634,36 +918,36 @@ def login_html(error=None):
                 padding: 12px;
                 margin-bottom: 20px;
                 font-size: 14px;
-            }}
+            }
             
-            .form-group {{
+            .form-group {
                 margin-bottom: 20px;
-            }}
+            }
             
-            label {{
+            label {
                 display: block;
                 color: #333;
                 font-weight: 500;
                 margin-bottom: 8px;
                 font-size: 14px;
-            }}
+            }
             
-            input {{
+            input {
                 width: 100%;
                 padding: 12px;
                 border: 1px solid #ddd;
                 border-radius: 6px;
                 font-size: 14px;
                 transition: border-color 0.3s;
-            }}
+            }
             
-            input:focus {{
+            input:focus {
                 outline: none;
                 border-color: #667eea;
                 box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-            }}
+            }
             
-            button {{
+            button {
                 width: 100%;
                 padding: 12px;
                 background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
@@ -674,15 +958,15 @@ def login_html(error=None):
                 font-weight: 600;
                 cursor: pointer;
                 transition: transform 0.2s;
-            }}
+            }
             
-            button:hover {{
+            button:hover {
                 transform: translateY(-2px);
-            }}
+            }
             
-            button:active {{
+            button:active {
                 transform: translateY(0);
-            }}
+            }
         </style>
     </head>
     <body>
@@ -710,27 +994,33 @@ def login_html(error=None):
     </html>
     '''
 
+# Pré-codificado uma vez; só o erro é formatado por pedido
+_LOGIN_HEAD, _, _LOGIN_TAIL = (part.encode('utf-8') for part in LOGIN_TEMPLATE.partition('{error_msg}'))
+
+def login_html(error=None):
+    """Página de login HTML"""
+    error_msg = f'<div class="error-message">{html.escape(error)}</div>'.encode('utf-8') if error else b''
+    return Response(_LOGIN_HEAD + error_msg + _LOGIN_TAIL, mimetype='text/html')
+
 # ============================================================================
 # MAIN
 # ============================================================================
 
 if __name__ == '__main__':
-    log_info(f"Starting Flask server on port {PORT}")
-    log_info(f"Environment: {FLASK_ENV}")
-    log_info(f"Authentication: ENABLED")
-    log_info(f"Secret Key: {'Custom' if os.getenv('FLASK_SECRET_KEY') else 'Default (DEV ONLY)'}")
-    log_info(f"Repository Path: {REPO_PATH}")
+    logger.info(f"Starting Flask server on port {PORT}")
+    logger.info(f"Environment: {FLASK_ENV}")
+    logger.info(f"Authentication: ENABLED")
+    logger.info(f"Secret Key: {'Custom' if os.getenv('FLASK_SECRET_KEY') else 'Default (DEV ONLY)'}")
+    logger.info(f"Repository Path: {REPO_PATH}")
     
     # Create log file if it doesn't exist
-    log_file = os.path.join(REPO_PATH, 'sync.log')
-    if not os.path.exists(log_file):
-        Path(log_file).touch()
+    if not LOG_FILE_PATH.exists():
+        LOG_FILE_PATH.touch()
     
     # Create static directory if it doesn't exist
-    static_dir = os.path.join(os.path.dirname(__file__), 'static')
-    if not os.path.exists(static_dir):
-        os.makedirs(static_dir)
-        log_info(f"Created static directory: {static_dir}")
+    if not STATIC_DIR.exists():
+        STATIC_DIR.mkdir(parents=True)
+        logger.info(f"Created static directory: {STATIC_DIR}")
     
     app.run(
         host='0.0.0.0',
@@ -9,46 +9,374 @@ Versão: 1.0
 Data: Janeiro 2026
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session
+# gevent tem de fazer monkey-patch antes de qualquer outro import
+# (torna os sockets do requests cooperativos)
+try:
+    from gevent import monkey
+    monkey.patch_all()
+except ImportError:
+    pass
+
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, session, stream_with_context
+from flask_compress import Compress
 from flask_cors import CORS
 import os
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
 from datetime import datetime, timedelta
 from functools import wraps
+from pathlib import Path
+from types import MappingProxyType
 from dotenv import load_dotenv
+from werkzeug.security import check_password_hash
 import secrets
 import hashlib
+import hmac
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from calendar_common import OrjsonProvider
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
 # Inicializar Flask
 app = Flask(__name__, template_folder='templates', static_folder='static')
+app.json = OrjsonProvider(app)
 CORS(app)
 
+def load_secret_key():
+    """Chave de sessão persistida em disco (sem FLASK_SECRET_KEY, um restart não invalida sessões)"""
+    key_path = Path(os.getenv('REPO_PATH', '.')) / '.flask_secret'
+    try:
+        if not key_path.exists():
+            # Escrever num ficheiro temporário e ligar de forma atómica:
+            # se vários workers arrancam ao mesmo tempo, só o primeiro link vence
+            tmp_path = key_path.with_name(f'.flask_secret.{os.getpid()}')
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(secrets.token_bytes(32))
+            try:
+                os.link(tmp_path, key_path)
+            except FileExistsError:
+                pass
+            finally:
+                tmp_path.unlink()
+        return key_path.read_bytes()
+    except OSError as e:
+        # Filesystem só de leitura: chave em memória (sessões não sobrevivem a um restart)
+        app.logger.warning(f'Não foi possível persistir {key_path} ({e}); a usar chave de sessão temporária')
+        return secrets.token_bytes(32)
+
 # Configuração
-app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', secrets.token_hex(32))
+app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY') or load_secret_key()
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SECURE'] = os.getenv('FLASK_ENV') == 'production'
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=1)
 
+# Compressão das respostas JSON/HTML (text/event-stream fica de fora)
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_LEVEL'] = 4
+app.config['COMPRESS_BR_LEVEL'] = 4
+app.config['COMPRESS_MIN_SIZE'] = 512
+Compress(app)
+
 # Credenciais
 WEB_USERNAME = os.getenv('WEB_USERNAME', 'admin')
 WEB_PASSWORD = os.getenv('WEB_PASSWORD', 'admin123')
+WEB_PASSWORD_HASH = os.getenv('WEB_PASSWORD_HASH')  # hash werkzeug; tem prioridade sobre WEB_PASSWORD
+WEB_USERNAME_BYTES = WEB_USERNAME.encode('utf-8')
+WEB_PASSWORD_BYTES = WEB_PASSWORD.encode('utf-8')
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
 GITHUB_REPO = os.getenv('GITHUB_REPO')
 GITHUB_WORKFLOW_ID = os.getenv('GITHUB_WORKFLOW_ID', 'full_auto_workflow.yml')
 GITHUB_BRANCH = os.getenv('GITHUB_BRANCH', 'main')
 GITHUB_OWNER = os.getenv('GITHUB_OWNER')
 
-# Headers GitHub
-GITHUB_HEADERS = {
+# Headers e URLs GitHub (fixos por ambiente, construídos uma vez)
+GITHUB_HEADERS = MappingProxyType({
     'Authorization': f'Bearer {GITHUB_TOKEN}',
     'Accept': 'application/vnd.github.v3+json',
     'X-GitHub-Api-Version': '2022-11-28'
-}
+})
+GITHUB_WORKFLOW_URL = f'https://api.github.com/repos/{GITHUB_REPO}/actions/workflows/{GITHUB_WORKFLOW_ID}'
+GITHUB_DISPATCH_URL = f'{GITHUB_WORKFLOW_URL}/dispatches'
+GITHUB_RUNS_URL = f'{GITHUB_WORKFLOW_URL}/runs'
+GITHUB_LATEST_RUN_URL = f'{GITHUB_RUNS_URL}?per_page=1'
+MAX_HISTORY_LIMIT = 30
+
+# ETag do último 200 por URL: GETs condicionais com resposta 304 não gastam rate limit
+_github_etags = {}
+
+# Sessão HTTP partilhada: keep-alive reaproveita a ligação TLS ao api.github.com.
+# Só GETs são repetidos - repetir o POST de dispatch podia disparar o workflow duas vezes.
+# Esgotadas as tentativas, o último 5xx é devolvido (raise_on_status=False) em vez de
+# RetryError, para chegar aos ramos status_code das rotas com o código original
+gh_session = requests.Session()
+gh_session.headers.update(GITHUB_HEADERS)
+gh_session.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504],
+                      allowed_methods=['GET'], raise_on_status=False)
+))
+
+# Rate limit GitHub (atualizado a partir dos headers de cada resposta)
+RATE_LIMIT_RESERVE = int(os.getenv('GITHUB_RATE_LIMIT_RESERVE', 50))
+_rate_limit = {'remaining': None, 'reset': 0}
+
+# Cache das respostas GitHub (Redis se REDIS_URL, senão memória do worker)
+GITHUB_CACHE_TTL = int(os.getenv('GITHUB_CACHE_TTL', 15))
+STALE_CACHE_TTL = 24 * 3600  # cópia antiga servida quando o rate limit aperta
+STATUS_CACHE_KEY = 'gh:/api/workflow-status:1'
+HISTORY_CACHE_PREFIX = 'gh:/api/workflow-history:'
+OVERVIEW_CACHE_PREFIX = 'gh:/api/workflow-overview:'
+
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    import redis
+    rcache = redis.from_url(REDIS_URL)
+else:
+    rcache = None
+
+_local_cache = {}
+_stale_cache = {}
+
+# Disparos de workflow em background (estado consultável por job_id).
+# Só com Redis: o poll do job pode cair noutro worker gunicorn
+_TRIGGER_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+TRIGGER_JOB_TTL = 300
+
+# Stream SSE: um único poller GitHub partilhado por todos os browsers
+STREAM_POLL_INTERVAL = int(os.getenv('STREAM_POLL_INTERVAL', 10))
+STREAM_KEEPALIVE = 25
+_stream_subscribers = set()
+_stream_lock = threading.Lock()
+_stream_thread = None
+_stream_last = None
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+def cache_get(key):
+    """Obter resposta em cache (bytes) ou None"""
+    if rcache is not None:
+        return rcache.get(key)
+    entry = _local_cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+def cache_set(key, body, ttl=GITHUB_CACHE_TTL):
+    """Guardar resposta em cache durante ttl segundos (+ cópia stale)"""
+    if rcache is not None:
+        rcache.setex(key, ttl, body)
+        rcache.setex(f'stale:{key}', STALE_CACHE_TTL, body)
+    else:
+        _local_cache[key] = (time.monotonic() + ttl, body)
+        _stale_cache[key] = body
+
+def cache_get_stale(key):
+    """Última resposta conhecida, mesmo que expirada"""
+    if rcache is not None:
+        return rcache.get(f'stale:{key}')
+    return _stale_cache.get(key)
+
+def cache_invalidate():
+    """Descartar status e histórico em cache (após disparar workflow)"""
+    if rcache is not None:
+        keys = list(rcache.scan_iter('gh:*'))
+        if keys:
+            rcache.delete(*keys)
+    else:
+        _local_cache.clear()
+
+def cached_response(body):
+    """Resposta JSON servida diretamente da cache"""
+    response = Response(body, mimetype='application/json')
+    response.headers['X-Cache'] = 'HIT'
+    return response
+
+def store_response(key, response):
+    """Guardar resposta JSON na cache e marcar como MISS"""
+    cache_set(key, response.get_data())
+    response.headers['X-Cache'] = 'MISS'
+    return response
+
+# ============================================================================
+# DISPARO DE WORKFLOW (BACKGROUND)
+# ============================================================================
+
+def job_set(job_id, state):
+    """Guardar estado de um disparo em Redis (partilhado entre workers)"""
+    rcache.setex(f'job:{job_id}', TRIGGER_JOB_TTL, orjson.dumps(state))
+
+def job_get(job_id):
+    """Estado de um disparo (JSON) ou None se desconhecido/expirado"""
+    return rcache.get(f'job:{job_id}')
+
+def dispatch_workflow(user, timestamp):
+    """POST de dispatch ao GitHub; devolve o estado resultante (dict, com o timestamp do pedido)"""
+    payload = {
+        'ref': GITHUB_BRANCH,
+        'inputs': {
+            'triggered_by': user,
+            'timestamp': timestamp
+        }
+    }
+    
+    try:
+        response = gh_session.post(
+            GITHUB_DISPATCH_URL,
+            json=payload,
+            timeout=10
+        )
+        
+        if response.status_code == 204:
+            cache_invalidate()
+            state = {'status': 'success', 'message': 'Workflow disparado com sucesso'}
+        elif response.status_code == 401:
+            state = {'status': 'error', 'code': 401, 'message': 'GitHub token inválido'}
+        elif response.status_code == 404:
+            state = {'status': 'error', 'code': 404, 'message': 'Repositório ou workflow não encontrado'}
+        else:
+            state = {'status': 'error', 'code': response.status_code, 'message': f'Erro GitHub: {response.text}'}
+    
+    except requests.exceptions.Timeout:
+        state = {'status': 'error', 'code': 504, 'message': 'Timeout na requisição GitHub'}
+    except requests.exceptions.ConnectionError:
+        state = {'status': 'error', 'code': 503, 'message': 'Erro de conexão com GitHub'}
+    except Exception as e:
+        app.logger.error(f'Erro ao disparar workflow: {str(e)}')
+        state = {'status': 'error', 'code': 500, 'message': f'Erro interno: {str(e)}'}
+    
+    state['timestamp'] = timestamp
+    return state
+
+def dispatch_workflow_job(job_id, user, timestamp):
+    """Disparo em background: regista o resultado no job"""
+    job_set(job_id, dispatch_workflow(user, timestamp))
+
+# ============================================================================
+# RATE LIMIT GITHUB
+# ============================================================================
+
+def track_rate_limit(response, *args, **kwargs):
+    """Hook da sessão: guardar X-RateLimit-Remaining/Reset de cada resposta"""
+    remaining = response.headers.get('X-RateLimit-Remaining')
+    if remaining is not None:
+        _rate_limit['remaining'] = int(remaining)
+        _rate_limit['reset'] = int(response.headers.get('X-RateLimit-Reset', 0))
+
+gh_session.hooks['response'].append(track_rate_limit)
+
+def rate_limited():
+    """True se o orçamento GitHub está abaixo da reserva até ao próximo reset"""
+    remaining = _rate_limit['remaining']
+    return remaining is not None and remaining < RATE_LIMIT_RESERVE and time.time() < _rate_limit['reset']
+
+def rate_limited_response(key):
+    """Servir a última resposta conhecida (STALE) ou 429 se não houver"""
+    stale = cache_get_stale(key)
+    if stale:
+        response = Response(stale, mimetype='application/json')
+        response.headers['X-Cache'] = 'STALE'
+        return response
+    
+    reset = _rate_limit['reset']
+    response = json_error(429, f'Rate limit GitHub; tentar após {datetime.fromtimestamp(reset).strftime("%H:%M:%S")}')
+    response.headers['Retry-After'] = str(max(0, int(reset - time.time())))
+    return response
+
+def github_get(url):
+    """GET condicional ao GitHub; devolve (status_code, json) reaproveitando o JSON em 304"""
+    cached = _github_etags.get(url)
+    headers = {'If-None-Match': cached[0]} if cached else None
+    response = gh_session.get(url, headers=headers, timeout=10)
+    
+    if response.status_code == 304 and cached:
+        return 200, cached[1]
+    if response.status_code != 200:
+        return response.status_code, None
+    
+    data = orjson.loads(response.content)
+    etag = response.headers.get('ETag')
+    if etag:
+        _github_etags[url] = (etag, data)
+    return 200, data
+
+# ============================================================================
+# STREAM DE STATUS (SSE)
+# ============================================================================
+
+def summarize_run(run):
+    """Campos do run expostos ao dashboard"""
+    return {
+        'id': run['id'],
+        'status': run['status'],
+        'conclusion': run.get('conclusion'),
+        'name': run['name'],
+        'created_at': run['created_at'],
+        'updated_at': run['updated_at'],
+        'run_number': run['run_number'],
+        'html_url': run['html_url']
+    }
+
+def fetch_latest_run():
+    """Último run do workflow (dict resumido) ou None se não houver runs"""
+    status_code, data = github_get(GITHUB_LATEST_RUN_URL)
+    if status_code != 200:
+        raise requests.exceptions.HTTPError(f'GitHub respondeu {status_code}')
+    runs = data.get('workflow_runs')
+    return summarize_run(runs[0]) if runs else None
+
+def stream_poller():
+    """Consultar o GitHub periodicamente e publicar alterações aos subscritores"""
+    global _stream_thread, _stream_last
+    while True:
+        with _stream_lock:
+            if not _stream_subscribers:
+                _stream_thread = None
+                return
+        
+        if rate_limited():
+            time.sleep(STREAM_POLL_INTERVAL)
+            continue
+        
+        try:
+            payload = orjson.dumps({'run': fetch_latest_run()}).decode('utf-8')
+        except Exception as e:
+            app.logger.error(f'Erro no poller de status: {str(e)}')
+        else:
+            if payload != _stream_last:
+                _stream_last = payload
+                with _stream_lock:
+                    for q in _stream_subscribers:
+                        q.put(payload)
+        
+        time.sleep(STREAM_POLL_INTERVAL)
+
+def stream_subscribe():
+    """Registar subscritor e arrancar o poller se ainda não estiver ativo"""
+    global _stream_thread
+    q = queue.Queue()
+    with _stream_lock:
+        _stream_subscribers.add(q)
+        if _stream_thread is None:
+            _stream_thread = threading.Thread(target=stream_poller, daemon=True)
+            _stream_thread.start()
+    return q
+
+def stream_unsubscribe(q):
+    """Remover subscritor (o poller termina quando não restar nenhum)"""
+    with _stream_lock:
+        _stream_subscribers.discard(q)
 
 # ============================================================================
 # DECORADORES
@@ -65,9 +393,11 @@ def login_required(f):
 
 def json_error(status_code, message):
     """Gera resposta JSON de erro"""
-    response = jsonify({'error': message, 'status': status_code})
-    response.status_code = status_code
-    return response
+    return Response(orjson.dumps({'error': message, 'status': status_code}), status=status_code, mimetype='application/json')
+
+# Corpos fixos dos error handlers (serializados uma vez)
+NOT_FOUND_BODY = orjson.dumps({'error': 'Rota não encontrada', 'status': 404})
+SERVER_ERROR_BODY = orjson.dumps({'error': 'Erro interno do servidor', 'status': 500})
 
 # ============================================================================
 # ROTAS: AUTENTICAÇÃO
@@ -78,11 +408,23 @@ def login():
     """Página de login"""
     if request.method == 'POST':
         data = request.get_json() if request.is_json else request.form
+        if not isinstance(data, dict):
+            return json_error(400, 'Pedido inválido')
         username = data.get('username', '')
         password = data.get('password', '')
         
-        # Verificar credenciais
-        if username == WEB_USERNAME and password == WEB_PASSWORD:
+        # JSON pode trazer números/null: rejeitar antes do compare_digest
+        if not isinstance(username, str) or not isinstance(password, str):
+            return json_error(400, 'Credenciais inválidas')
+
+        # Verificar credenciais (comparação em tempo constante)
+        user_ok = hmac.compare_digest(username.encode('utf-8'), WEB_USERNAME_BYTES)
+        if WEB_PASSWORD_HASH:
+            pass_ok = check_password_hash(WEB_PASSWORD_HASH, password)
+        else:
+            pass_ok = hmac.compare_digest(password.encode('utf-8'), WEB_PASSWORD_BYTES)
+        
+        if user_ok and pass_ok:
             session.permanent = True
             session['user'] = username
             session['login_time'] = datetime.now().isoformat()
@@ -129,51 +471,41 @@ def dashboard():
 @app.route('/api/trigger-workflow', methods=['POST'])
 @login_required
 def trigger_workflow():
-    """Disparar workflow de sincronização"""
-    try:
-        if not GITHUB_TOKEN or not GITHUB_REPO:
-            return json_error(400, 'GitHub não configurado. Verifique .env')
-        
-        # Dados para GitHub API
-        api_url = f'https://api.github.com/repos/{GITHUB_REPO}/actions/workflows/{GITHUB_WORKFLOW_ID}/dispatches'
-        
-        payload = {
-            'ref': GITHUB_BRANCH,
-            'inputs': {
-                'triggered_by': session.get('user'),
-                'timestamp': datetime.now().isoformat()
-            }
-        }
-        
-        # Fazer requisição
-        response = requests.post(
-            api_url,
-            headers=GITHUB_HEADERS,
-            json=payload,
-            timeout=10
-        )
-        
-        # Verificar resposta
-        if response.status_code == 204:
-            return jsonify({
-                'status': 'success',
-                'message': 'Workflow disparado com sucesso',
-                'timestamp': datetime.now().isoformat()
-            })
-        elif response.status_code == 401:
-            return json_error(401, 'GitHub token inválido')
-        elif response.status_code == 404:
-            return json_error(404, 'Repositório ou workflow não encontrado')
-        else:
-            return json_error(response.status_code, f'Erro GitHub: {response.text}')
+    """Disparar workflow de sincronização (com Redis em background, responde 202)"""
+    if not GITHUB_TOKEN or not GITHUB_REPO:
+        return json_error(400, 'GitHub não configurado. Verifique .env')
     
-    except requests.exceptions.Timeout:
-        return json_error(504, 'Timeout na requisição GitHub')
-    except requests.exceptions.ConnectionError:
-        return json_error(503, 'Erro de conexão com GitHub')
-    except Exception as e:
-        app.logger.error(f'Erro ao disparar workflow: {str(e)}')
-        return json_error(500, f'Erro interno: {str(e)}')
+    user = session.get('user')
+    timestamp = datetime.now().isoformat()
+    
+    # Sem store partilhado o estado do job ficaria num só worker: disparo síncrono,
+    # com as mesmas respostas de sempre (erros no formato json_error)
+    if rcache is None:
+        state = dispatch_workflow(user, timestamp)
+        if state['status'] == 'error':
+            return json_error(state['code'], state['message'])
+        return jsonify(state)
+    
+    job_id = uuid.uuid4().hex
+    job_set(job_id, {'status': 'pending', 'message': 'Pedido enviado ao GitHub'})
+    _TRIGGER_EXECUTOR.submit(dispatch_workflow_job, job_id, user, timestamp)
+    
+    return jsonify({
+        'status': 'accepted',
+        'job_id': job_id,
+        'status_url': url_for('trigger_workflow_status', job_id=job_id)
+    }), 202
+
+@app.route('/api/trigger-workflow/<job_id>', methods=['GET'])
+@login_required
+def trigger_workflow_status(job_id):
+    """Estado de um disparo de workflow"""
+    if rcache is None:
+        return json_error(404, 'Disparo não encontrado')
+    job = job_get(job_id)
+    if job is None:
+        return json_error(404, 'Disparo não encontrado')
+    return Response(job, mimetype='application/json')
 
 @app.route('/api/workflow-status', methods=['GET'])
 @login_required
@@ -183,42 +515,30 @@ def workflow_status():
         if not GITHUB_TOKEN or not GITHUB_REPO:
             return json_error(400, 'GitHub não configurado')
         
-        # URL da API GitHub para workflows
-        api_url = f'https://api.github.com/repos/{GITHUB_REPO}/actions/workflows/{GITHUB_WORKFLOW_ID}/runs?per_page=1'
+        cached = cache_get(STATUS_CACHE_KEY)
+        if cached:
+            return cached_response(cached)
+        if rate_limited():
+            return rate_limited_response(STATUS_CACHE_KEY)
         
-        response = requests.get(
-            api_url,
-            headers=GITHUB_HEADERS,
-            timeout=10
-        )
+        status_code, data = github_get(GITHUB_LATEST_RUN_URL)
         
-        if response.status_code != 200:
-            return json_error(response.status_code, 'Erro ao obter status do workflow')
-        
-        data = response.json()
+        if status_code != 200:
+            return json_error(status_code, 'Erro ao obter status do workflow')
         
         if not data.get('workflow_runs'):
-            return jsonify({
+            return store_response(STATUS_CACHE_KEY, jsonify({
                 'status': 'no_runs',
                 'message': 'Nenhuma execução encontrada',
                 'run': None
-            })
+            }))
         
         run = data['workflow_runs'][0]
         
-        return jsonify({
+        return store_response(STATUS_CACHE_KEY, jsonify({
             'status': 'success',
-            'run': {
-                'id': run['id'],
-                'status': run['status'],
-                'conclusion': run.get('conclusion'),
-                'name': run['name'],
-                'created_at': run['created_at'],
-                'updated_at': run['updated_at'],
-                'run_number': run['run_number'],
-                'html_url': run['html_url']
-            }
-        })
+            'run': summarize_run(run)
+        }))
     
     except requests.exceptions.Timeout:
         return json_error(504, 'Timeout na requisição GitHub')
@@ -228,6 +548,35 @@ def workflow_status():
         app.logger.error(f'Erro ao obter status: {str(e)}')
         return json_error(500, f'Erro interno: {str(e)}')
 
+@app.route('/api/workflow-stream', methods=['GET'])
+@login_required
+def workflow_stream():
+    """Stream SSE com o status do último workflow (push em cada alteração)"""
+    if not GITHUB_TOKEN or not GITHUB_REPO:
+        return json_error(400, 'GitHub não configurado')
+    
+    q = stream_subscribe()
+    
+    def generate():
+        try:
+            if _stream_last:
+                yield f'data: {_stream_last}\n\n'
+            while True:
+                try:
+                    payload = q.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f'data: {payload}\n\n'
+        finally:
+            stream_unsubscribe(q)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/workflow-history', methods=['GET'])
 @login_required
 def workflow_history():
@@ -237,42 +586,27 @@ def workflow_history():
             return json_error(400, 'GitHub não configurado')
         
         # Parâmetros
-        limit = request.args.get('limit', 10, type=int)
-        if limit > 100:
-            limit = 100  # Limite máximo
+        limit = min(max(request.args.get('limit', 10, type=int), 1), MAX_HISTORY_LIMIT)
         
-        # URL da API GitHub para workflows
-        api_url = f'https://api.github.com/repos/{GITHUB_REPO}/actions/workflows/{GITHUB_WORKFLOW_ID}/runs?per_page={limit}'
+        cache_key = f'{HISTORY_CACHE_PREFIX}{limit}'
+        cached = cache_get(cache_key)
+        if cached:
+            return cached_response(cached)
+        if rate_limited():
+            return rate_limited_response(cache_key)
         
-        response = requests.get(
-            api_url,
-            headers=GITHUB_HEADERS,
-            timeout=10
-        )
+        status_code, data = github_get(f'{GITHUB_RUNS_URL}?per_page={limit}')
         
-        if response.status_code != 200:
-            return json_error(response.status_code, 'Erro ao obter histórico')
+        if status_code != 200:
+            return json_error(status_code, 'Erro ao obter histórico')
         
-        data = response.json()
+        runs = [summarize_run(run) for run in data.get('workflow_runs', [])]
         
-        runs = []
-        for run in data.get('workflow_runs', []):
-            runs.append({
-                'id': run['id'],
-                'run_number': run['run_number'],
-                'status': run['status'],
-                'conclusion': run.get('conclusion'),
-                'name': run['name'],
-                'created_at': run['created_at'],
-                'updated_at': run['updated_at'],
-                'html_url': run['html_url']
-            })
-        
-        return jsonify({
+        return store_response(cache_key, jsonify({
             'status': 'success',
             'total_count': data.get('total_count', len(runs)),
             'runs': runs
-        })
+        }))
     
     except requests.exceptions.Timeout:
         return json_error(504, 'Timeout na requisição GitHub')
@@ -282,6 +616,46 @@ def workflow_history():
         app.logger.error(f'Erro ao obter histórico: {str(e)}')
         return json_error(500, f'Erro interno: {str(e)}')
 
+@app.route('/api/workflow-overview', methods=['GET'])
+@login_required
+def workflow_overview():
+    """Último workflow + histórico numa só chamada GitHub"""
+    try:
+        if not GITHUB_TOKEN or not GITHUB_REPO:
+            return json_error(400, 'GitHub não configurado')
+        
+        # Parâmetros
+        limit = min(max(request.args.get('limit', 10, type=int), 1), MAX_HISTORY_LIMIT)
+        
+        cache_key = f'{OVERVIEW_CACHE_PREFIX}{limit}'
+        cached = cache_get(cache_key)
+        if cached:
+            return cached_response(cached)
+        if rate_limited():
+            return rate_limited_response(cache_key)
+        
+        # O primeiro run do histórico é o último run: um único pedido chega
+        status_code, data = github_get(f'{GITHUB_RUNS_URL}?per_page={limit}')
+        
+        if status_code != 200:
+            return json_error(status_code, 'Erro ao obter workflows')
+        runs = [summarize_run(run) for run in data.get('workflow_runs', [])]
+        
+        return store_response(cache_key, jsonify({
+            'status': 'success',
+            'run': runs[0] if runs else None,
+            'total_count': data.get('total_count', len(runs)),
+            'runs': runs
+        }))
+    
+    except requests.exceptions.Timeout:
+        return json_error(504, 'Timeout na requisição GitHub')
+    except requests.exceptions.ConnectionError:
+        return json_error(503, 'Erro de conexão com GitHub')
+    except Exception as e:
+        app.logger.error(f'Erro ao obter overview: {str(e)}')
+        return json_error(500, f'Erro interno: {str(e)}')
+
 # ============================================================================
 # ROTAS: ERROR HANDLERS
 # ============================================================================
@@ -289,13 +663,13 @@ def workflow_history():
 @app.errorhandler(404)
 def not_found(error):
     """Página 404"""
-    return json_error(404, 'Rota não encontrada'), 404
+    return Response(NOT_FOUND_BODY, status=404, mimetype='application/json')
 
 @app.errorhandler(500)
 def server_error(error):
     """Página 500"""
     app.logger.error(f'Erro interno do servidor: {str(error)}')
-    return json_error(500, 'Erro interno do servidor'), 500
+    return Response(SERVER_ERROR_BODY, status=500, mimetype='application/json')
 
 # ============================================================================
 # HEALTH CHECK
@@ -329,5 +703,5 @@ if __name__ == '__main__':
 ╚════════════════════════════════════════════════════════════╝
 """)
     
-    # Iniciar servidor
+    # Servidor de desenvolvimento (produção: gunicorn -c gunicorn.conf.py app_fase2:app)
     app.run(host='0.0.0.0', port=port, debug=debug)
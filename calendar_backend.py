@@ -10,16 +10,31 @@ Date: January 9, 2026
 
 """
 
-from flask import Flask, jsonify, request, send_file, send_from_directory, redirect, session, url_for
+from flask import Flask, Response, g, jsonify, request, send_file, send_from_directory, redirect, session, url_for
 from flask_cors import CORS
-from icalendar import Calendar, Event
+from flask_compress import Compress
+import atexit
+import html
+import mmap
 import os
+import queue
+import re
 from pathlib import Path
 from datetime import datetime, timedelta
 import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
-import json
+import orjson
+import uuid
+from itertools import islice
+from calendar_common import (
+    MANUAL_CALENDAR_EPILOG, MANUAL_CALENDAR_PROLOG, OrjsonProvider,
+    format_manual_event, ics_unescape, write_file_atomic
+)
 
 # ============================================================================
 # CONFIGURATION
@@ -27,9 +42,22 @@ import json
 
 load_dotenv()
 
-app = Flask(__name__, static_folder='static', static_url_path='/static')
+# Sem rota estática automática: /static é servido por serve_static (com auth)
+app = Flask(__name__, static_folder=None)
+app.json = OrjsonProvider(app)
 CORS(app)
 
+# Compressão das respostas JSON; só calendários com mais de um chunk de eventos
+# seguem em streaming (cache miss), sem compressão para não serem bufferizados.
+# Os restantes e todos os hits em cache são comprimidos
+app.config['COMPRESS_MIMETYPES'] = ['application/json']
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_LEVEL'] = 4
+app.config['COMPRESS_BR_LEVEL'] = 4
+app.config['COMPRESS_MIN_SIZE'] = 1024
+app.config['COMPRESS_STREAMS'] = False
+Compress(app)
+
 # ⭐ IMPORTANTE: Usar FLASK_SECRET_KEY (sem expor valor real!)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
 
@@ -43,24 +71,87 @@ CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'localhost,127.0.0.1')
 ADMIN_USERNAME = os.getenv('WEB_USERNAME', 'admin')
 ADMIN_PASSWORD = os.getenv('WEB_PASSWORD', 'admin123')
 
+# Sessões
+app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=24)
+
+# Sessões em Redis (opcional) - o cookie leva só o id da sessão e o estado
+# fica partilhado entre workers; sem REDIS_URL mantém-se o cookie assinado
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    import redis
+    from flask_session import Session
+    
+    app.config['SESSION_TYPE'] = 'redis'
+    app.config['SESSION_REDIS'] = redis.from_url(REDIS_URL)
+    app.config['SESSION_USE_SIGNER'] = True
+    Session(app)
+
 # File paths
 IMPORT_CALENDAR_PATH = os.path.join(REPO_PATH, 'import_calendar.ics')
 MASTER_CALENDAR_PATH = os.path.join(REPO_PATH, 'master_calendar.ics')
 MANUAL_CALENDAR_PATH = os.path.join(REPO_PATH, 'manual_calendar.ics')
 SYNC_SCRIPT_PATH = os.path.join(REPO_PATH, 'sync_calendars.py')
 
-# Logging
+# Jobs de sincronização em background: {job_id: {'future': Future, 'started': datetime}}
+_SYNC_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+_SYNC_JOBS = {}
+_SYNC_JOBS_LOCK = threading.Lock()
+SYNC_JOB_TTL = timedelta(hours=1)
+
+# Gravações de manual_calendar.ics (threads do gunicorn gthread)
+_MANUAL_SAVE_LOCK = threading.Lock()
+
+# Corpo do /api/health: só o timestamp e o estado de autenticação variam
+HEALTH_BODY_PREFIX = b'{"status":"healthy","environment":' + orjson.dumps(FLASK_ENV) + b',"version":"3.1.2","timestamp":'
+HEALTH_BODY_SUFFIX_AUTH = b',"authenticated":true}'
+HEALTH_BODY_SUFFIX_ANON = b',"authenticated":false}'
+
+# Corpos fixos dos handlers de erro
+NOT_FOUND_BODY = orjson.dumps({'status': 'error', 'message': 'Endpoint not found'})
+SERVER_ERROR_BODY = orjson.dumps({'status': 'error', 'message': 'Internal server error'})
+
+# Ficheiros estáticos (caminhos absolutos calculados uma vez)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+MANUAL_CALENDAR_HTML = os.path.join(STATIC_DIR, 'manual_calendar.html')
+STATIC_MAX_AGE = 3600
+PUBLIC_STATIC_FILES = frozenset(['login.html', 'css/login.css', 'css/style.css', 'js/login.js'])
+
+# Logging - os pedidos só enfileiram; a escrita em disco/stderr é feita
+# por um QueueListener em background
+_log_queue = queue.Queue(-1)
+_log_formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] %(message)s')
+_log_handlers = [logging.FileHandler(os.path.join(REPO_PATH, 'sync.log')), logging.StreamHandler()]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+
+# O QueueHandler só passa a mensagem; o formato é aplicado pelos handlers do listener
 logging.basicConfig(
     level=logging.INFO,
-    format='[%(asctime)s] [%(levelname)s] %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(REPO_PATH, 'sync.log')),
-        logging.StreamHandler()
-    ]
+    format='%(message)s',
+    handlers=[QueueHandler(_log_queue)]
 )
 
+_log_listener = QueueListener(_log_queue, *_log_handlers)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logger = logging.getLogger(__name__)
 
+# Parser ICS (regex sobre o ficheiro mapeado em memória)
+VEVENT_RE = re.compile(rb'^BEGIN:VEVENT\r?$(.*?)^END:VEVENT', re.S | re.M)
+NESTED_COMPONENT_RE = re.compile(rb'^BEGIN:(\w+)\r?$.*?^END:\1\r?$', re.S | re.M)
+FOLDED_LINE_RE = re.compile(rb'\r?\n[ \t]')
+EVENT_PROPERTY_RE = re.compile(rb'^(UID|SUMMARY|DTSTART|DTEND|DESCRIPTION|CATEGORIES|STATUS)(?:;[^:\r\n]*)?:([^\r\n]*)', re.M)
+
+# Eventos serializados por ficheiro: path -> ((mtime_ns, size), events_json, count)
+_EVENTS_JSON_CACHE = {}
+
+# Conteúdo bruto dos ficheiros ICS: path -> ((mtime_ns, size), bytes)
+_ICS_BYTES_CACHE = {}
+
+# Eventos serializados por chunk ao fazer streaming das listas
+EVENTS_STREAM_CHUNK = 256
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
@@ -68,84 +159,203 @@ logger = logging.getLogger(__name__)
 def log_info(msg):
     """Log info message"""
     logger.info(msg)
-    print(f"[INFO] {msg}")
 
 def log_error(msg):
     """Log error message"""
     logger.error(msg)
-    print(f"[ERROR] {msg}")
 
 def file_exists(filepath):
     """Check if file exists"""
     return os.path.isfile(filepath)
 
-def is_authenticated():
-    """Check if user is authenticated"""
-    return session.get('authenticated', False)
-
-def read_ics_file(filepath):
-    """Read and parse ICS file"""
+def scan_repo():
+    """Map file names in REPO_PATH to their DirEntry (one directory read)"""
+    try:
+        with os.scandir(REPO_PATH) as it:
+            return {entry.name: entry for entry in it}
+    except OSError:
+        return {}
+
+def entry_stat_or_none(entry):
+    """DirEntry stat, or None when missing (dangling symlink, removed meanwhile)"""
+    if entry is None:
+        return None
     try:
-        if not file_exists(filepath):
-            return None
+        return entry.stat()
+    except OSError:
+        return None
+
+def is_authenticated():
+    """Check if user is authenticated (session read once per request)"""
+    if 'authenticated' not in g:
+        g.authenticated = bool(session.get('authenticated', False))
+    return g.authenticated
+
+def ics_date_to_iso(value):
+    """Convert ICS DATE / DATE-TIME string to ISO 8601 without building datetimes"""
+    if len(value) == 8:
+        return f'{value[:4]}-{value[4:6]}-{value[6:8]}'
+    if len(value) >= 15 and value[8] == 'T':
+        iso = f'{value[:4]}-{value[4:6]}-{value[6:8]}T{value[9:11]}:{value[11:13]}:{value[13:15]}'
+        return iso + '+00:00' if value.endswith('Z') else iso
+    return value
+
+def iter_ics_events(data):
+    """Yield VEVENTs from raw ICS bytes one at a time (precompiled regexes)"""
+    for match in VEVENT_RE.finditer(data):
+        body = FOLDED_LINE_RE.sub(b'', match.group(1))
+        if b'BEGIN:' in body:
+            body = NESTED_COMPONENT_RE.sub(b'', body)  # VALARM e afins
         
+        props = {}
+        for name, value in EVENT_PROPERTY_RE.findall(body):
+            props[name] = value.decode('utf-8', errors='replace')
+        
+        dtstart = props.get(b'DTSTART')
+        dtend = props.get(b'DTEND')
+        
+        yield {
+            'uid': props.get(b'UID', ''),
+            'summary': ics_unescape(props.get(b'SUMMARY', '')),
+            'dtstart': ics_date_to_iso(dtstart) if dtstart else None,
+            'dtend': ics_date_to_iso(dtend) if dtend else None,
+            'description': ics_unescape(props.get(b'DESCRIPTION', '')),
+            'categories': ics_unescape(props.get(b'CATEGORIES', '')),
+            'status': props.get(b'STATUS', 'CONFIRMED')
+        }
+
+def iter_ics_file(filepath):
+    """Parse ICS file lazily over a read-only mmap"""
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield from iter_ics_events(data)
+
+def events_head(filename):
+    """Start of the calendar JSON envelope, up to the opening of the events array"""
+    return b'{"file":' + orjson.dumps(filename) + b',"events":['
+
+def events_tail(count, now, error=None):
+    """Close the calendar JSON envelope (status last, so a failed stream still ends in valid JSON)"""
+    if error is None:
+        return b'],"count":%d,"status":"success","timestamp":%b}' % (count, orjson.dumps(now))
+    return b'],"count":%d,"status":"error","message":%b,"timestamp":%b}' % (
+        count, orjson.dumps(error), orjson.dumps(now))
+
+def events_envelope(filename, events_json, count):
+    """Wrap serialized events in the calendar JSON envelope"""
+    return events_head(filename) + events_json + events_tail(count, g.now)
+
+def ics_file_response(filepath, st, download_name=None):
+    """Raw ICS response served from memory, with ETag/Last-Modified and Range"""
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _ICS_BYTES_CACHE.get(filepath)
+    if cached and cached[0] == key:
+        data = cached[1]
+    else:
         with open(filepath, 'rb') as f:
-            cal = Calendar.from_ical(f.read())
-            events = []
-            
-            for component in cal.walk():
-                if component.name == "VEVENT":
-                    event = {
-                        'uid': str(component.get('uid', '')),
-                        'summary': str(component.get('summary', '')),
-                        'dtstart': component.get('dtstart'),
-                        'dtend': component.get('dtend'),
-                        'description': str(component.get('description', '')),
-                        'categories': str(component.get('categories', '')),
-                        'status': str(component.get('status', 'CONFIRMED'))
-                    }
-                    
-                    # Convert dates to strings
-                    if event['dtstart']:
-                        event['dtstart'] = event['dtstart'].dt.isoformat() if hasattr(event['dtstart'].dt, 'isoformat') else str(event['dtstart'].dt)
-                    if event['dtend']:
-                        event['dtend'] = event['dtend'].dt.isoformat() if hasattr(event['dtend'].dt, 'isoformat') else str(event['dtend'].dt)
-                    
-                    events.append(event)
-            
-            return events
+            data = f.read()
+        _ICS_BYTES_CACHE[filepath] = (key, data)
+    
+    response = Response(data, mimetype='text/calendar')
+    response.set_etag('%d-%d' % key)
+    response.last_modified = st.st_mtime
+    response.cache_control.no_cache = True
+    if download_name:
+        response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(data))
+
+def with_weak_etag(response, etag):
+    """Attach weak ETag and force revalidation on every poll (200 and 304 alike)"""
+    response.set_etag(etag, weak=True)
+    response.cache_control.no_cache = True
+    return response
+
+def calendar_events_response(filename, filepath):
+    """JSON (or raw text/calendar) response with the events of an ICS file
+    
+    Raises FileNotFoundError when the file is missing.
+    
+    Unchanged files (same mtime and size) are answered with 304 when the
+    client's If-None-Match matches, or from the cached serialized events.
+    Otherwise the first chunk of events is parsed before the response is
+    built (so errors there propagate to the caller) and the rest is
+    streamed lazily; the serialized result is cached once complete.
+    """
+    st = os.stat(filepath)
+    key = (st.st_mtime_ns, st.st_size)
+    
+    # Clientes que pedem o ICS em bruto recebem o ficheiro tal como está
+    if request.accept_mimetypes.best_match(['application/json', 'text/calendar']) == 'text/calendar':
+        return ics_file_response(filepath, st)
+    
+    # ETag fraco a partir do stat; o Flask-Compress acrescenta ":br"/":gzip"
+    # à tag devolvida, por isso o sufixo é ignorado na comparação
+    etag = '%x-%x' % key
+    if request.if_none_match and (
+        request.if_none_match.star_tag or
+        etag in {tag.split(':', 1)[0] for tag in request.if_none_match.as_set(include_weak=True)}
+    ):
+        return with_weak_etag(Response(status=304), etag)
+    
+    cached = _EVENTS_JSON_CACHE.get(filepath)
+    if not cached or cached[0] != key:
+        # O primeiro chunk é lido antes do 200: erros ao abrir/ler o início do
+        # ficheiro chegam ao handler da rota (JSON de erro 500)
+        events = map(orjson.dumps, iter_ics_file(filepath))
+        serialized = list(islice(events, EVENTS_STREAM_CHUNK))
+        if len(serialized) == EVENTS_STREAM_CHUNK:
+            response = Response(stream_events(filename, filepath, key, serialized, events, g.now),
+                                mimetype='application/json')
+            return with_weak_etag(response, etag)
+        
+        # Ficheiro lido por inteiro no primeiro chunk: resposta normal (comprimida)
+        cached = (key, b','.join(serialized), len(serialized))
+        _EVENTS_JSON_CACHE[filepath] = cached
+    
+    response = Response(events_envelope(filename, cached[1], cached[2]), mimetype='application/json')
+    return with_weak_etag(response, etag)
+
+def stream_events(filename, filepath, key, serialized, events, now):
+    """Stream the events JSON in chunks, starting from an already parsed first chunk
+    
+    A parse error after the 200 has gone out ends the body with an error
+    status instead of truncating it; only complete streams are cached.
+    """
+    yield events_head(filename) + b','.join(serialized)
     
+    start = len(serialized)
+    try:
+        for event_json in events:
+            serialized.append(event_json)
+            if len(serialized) - start == EVENTS_STREAM_CHUNK:
+                yield b',' + b','.join(serialized[start:])
+                start = len(serialized)
     except Exception as e:
-        log_error(f"Error reading ICS file {filepath}: {str(e)}")
-        return None
+        log_error(f"Error streaming {filename}: {str(e)}")
+        yield events_tail(start, now, str(e))
+        return
+    
+    if len(serialized) > start:
+        yield b',' + b','.join(serialized[start:])
+    yield events_tail(len(serialized), now)
+    _EVENTS_JSON_CACHE[filepath] = (key, b','.join(serialized), len(serialized))
 
 def save_manual_events(events):
     """Save manual events to manual_calendar.ics"""
     try:
-        cal = Calendar()
-        cal.add('prodid', '-//Rental Manual Calendar//PT')
-        cal.add('version', '2.0')
-        cal.add('calscale', 'GREGORIAN')
-        cal.add('x-wr-calname', 'Manual Calendar Events')
-        cal.add('x-wr-timezone', 'Europe/Lisbon')
+        created = f'{datetime.now():%Y%m%dT%H%M%S}'
         
-        for event_data in events:
-            event = Event()
-            event.add('summary', event_data.get('summary', 'Manual Event'))
-            event.add('dtstart', event_data.get('dtstart'))
-            event.add('dtend', event_data.get('dtend'))
-            event.add('uid', event_data.get('uid', f"manual-{datetime.now().timestamp()}@rental-calendar.com"))
-            event.add('categories', event_data.get('categories', 'MANUAL'))
-            event.add('description', event_data.get('description', ''))
-            event.add('status', event_data.get('status', 'CONFIRMED'))
-            event.add('transp', 'TRANSPARENT')
-            event.add('created', datetime.now())
-            
-            cal.add_component(event)
+        parts = [MANUAL_CALENDAR_PROLOG]
+        parts.extend(format_manual_event(event_data, created) for event_data in events)
+        parts.append(MANUAL_CALENDAR_EPILOG)
         
-        # Write to file
-        with open(MANUAL_CALENDAR_PATH, 'wb') as f:
-            f.write(cal.to_ical())
+        # Write to file (rename atómico: leitores com mmap nunca veem o ficheiro a meio).
+        # O lock serializa gravações concorrentes, que partilham o mesmo .tmp
+        data = b''.join(parts)
+        with _MANUAL_SAVE_LOCK:
+            write_file_atomic(MANUAL_CALENDAR_PATH, data)
         
         log_info(f"Saved {len(events)} manual events to {MANUAL_CALENDAR_PATH}")
         return True
@@ -154,6 +364,11 @@ def save_manual_events(events):
         log_error(f"Error saving manual events: {str(e)}")
         return False
 
+@app.before_request
+def stamp_request():
+    """Capture one timestamp per request for response bodies"""
+    g.now = datetime.now()
+
 # ============================================================================
 # AUTHENTICATION ROUTES
 # ============================================================================
@@ -183,8 +398,8 @@ def login_page():
             # ✅ Login bem-sucedido
             session['authenticated'] = True
             session['username'] = username
+            g.authenticated = True
             session.permanent = True
-            app.permanent_session_lifetime = timedelta(hours=24)
             
             log_info(f"✅ User '{username}' logged in successfully")
             
@@ -203,6 +418,7 @@ def logout():
     """Logout - Limpar sessão e ir para login"""
     username = session.get('username', 'unknown')
     session.clear()
+    g.pop('authenticated', None)
     
     log_info(f"User '{username}' logged out")
     
@@ -216,34 +432,30 @@ def logout():
 @app.route('/manual_calendar.html')
 def manual_calendar():
     """Página principal - protegida por autenticação"""
-    # ⭐ Verificar autenticação
     if not is_authenticated():
         return redirect(url_for('login_page'))
     
     try:
-        static_path = os.path.join(os.path.dirname(__file__), 'static', 'manual_calendar.html')
-        if os.path.exists(static_path):
-            return send_file(static_path)
-        else:
-            return jsonify({
-                'status': 'error',
-                'message': 'HTML file not found at /static/manual_calendar.html'
-            }), 404
-    except Exception as e:
-        log_error(f"Error serving manual_calendar: {str(e)}")
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        # conditional=True: 304 com If-None-Match/If-Modified-Since
+        return send_file(MANUAL_CALENDAR_HTML, conditional=True, max_age=None)
+    except FileNotFoundError:
+        log_error(f"HTML file not found: {MANUAL_CALENDAR_HTML}")
+        return jsonify({
+            'status': 'error',
+            'message': 'HTML file not found at /static/manual_calendar.html'
+        }), 404
 
 @app.route('/static/<path:filename>')
 def serve_static(filename):
-    """Serve static files - protegido por autenticação"""
+    """Serve static files (incl. página principal) - protegido por autenticação"""
     # ⭐ Proteger ficheiros estáticos (exceto login)
-    public_files = ['login.html', 'css/login.css', 'css/style.css', 'js/login.js']
-    
-    if not is_authenticated() and filename not in public_files:
+    if filename not in PUBLIC_STATIC_FILES and not is_authenticated():
         return redirect(url_for('login_page'))
     
     try:
-        return send_from_directory('static', filename)
+        # HTML sempre revalidado (ETag); assets em cache do browser
+        max_age = None if filename.endswith('.html') else STATIC_MAX_AGE
+        return send_from_directory(STATIC_DIR, filename, max_age=max_age)
     except Exception as e:
         log_info(f"Static file not found: {filename}")
         return jsonify({'status': 'error', 'message': f'File not found: {filename}'}), 404
@@ -255,13 +467,9 @@ def serve_static(filename):
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'timestamp': datetime.now().isoformat(),
-        'environment': FLASK_ENV,
-        'version': '3.1.2',
-        'authenticated': is_authenticated()
-    }), 200
+    body = (HEALTH_BODY_PREFIX + orjson.dumps(g.now) +
+            (HEALTH_BODY_SUFFIX_AUTH if is_authenticated() else HEALTH_BODY_SUFFIX_ANON))
+    return Response(body, mimetype='application/json')
 
 @app.route('/api/auth/status', methods=['GET'])
 def auth_status():
@@ -269,57 +477,116 @@ def auth_status():
     return jsonify({
         'authenticated': is_authenticated(),
         'username': session.get('username', None),
-        'timestamp': datetime.now().isoformat()
+        'timestamp': g.now
     }), 200
 
+def run_sync_script():
+    """Run sync script and return the job result (background)"""
+    try:
+        result = subprocess.run(
+            [sys.executable, SYNC_SCRIPT_PATH],
+            cwd=REPO_PATH,
+            capture_output=True,
+            timeout=300
+        )
+    except subprocess.TimeoutExpired:
+        log_error("Sync script timeout")
+        return {'status': 'error', 'message': 'Synchronization timeout'}
+    except Exception as e:
+        log_error(f"Sync error: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
+    
+    if result.returncode != 0:
+        # Output só é descodificado quando há erro
+        stderr = result.stderr.decode('utf-8', errors='replace')
+        log_error(f"Sync script error: {stderr}")
+        return {
+            'status': 'error',
+            'message': 'Synchronization failed',
+            'error': stderr
+        }
+    
+    log_info("Calendar synchronization completed successfully")
+    return {
+        'status': 'success',
+        'message': 'Synchronization completed',
+        'finished_at': datetime.now().isoformat()
+    }
+
+def prune_sync_jobs():
+    """Forget finished sync jobs older than SYNC_JOB_TTL"""
+    cutoff = datetime.now() - SYNC_JOB_TTL
+    with _SYNC_JOBS_LOCK:
+        for job_id in [j for j, job in _SYNC_JOBS.items() if job['future'].done() and job['started'] < cutoff]:
+            del _SYNC_JOBS[job_id]
+
 @app.route('/api/calendar/sync', methods=['GET', 'POST'])
 def sync_calendars():
-    """Execute calendar synchronization"""
+    """Start calendar synchronization in background"""
     if not is_authenticated():
         return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
     
     try:
-        log_info("Starting calendar synchronization...")
-        
         if not file_exists(SYNC_SCRIPT_PATH):
             return jsonify({
                 'status': 'error',
                 'message': f'Sync script not found: {SYNC_SCRIPT_PATH}'
             }), 404
         
-        result = subprocess.run(
-            [f'python {SYNC_SCRIPT_PATH}'],
-            shell=True,
-            cwd=REPO_PATH,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-        
-        if result.returncode != 0:
-            log_error(f"Sync script error: {result.stderr}")
-            return jsonify({
-                'status': 'error',
-                'message': 'Synchronization failed',
-                'error': result.stderr
-            }), 500
+        prune_sync_jobs()
         
-        log_info("Calendar synchronization completed successfully")
+        with _SYNC_JOBS_LOCK:
+            # Reutilizar job em curso em vez de enfileirar outro
+            running = next((j for j, job in _SYNC_JOBS.items() if not job['future'].done()), None)
+            if running:
+                job_id = running
+                message = 'Synchronization already running'
+            else:
+                log_info("Starting calendar synchronization...")
+                job_id = uuid.uuid4().hex
+                _SYNC_JOBS[job_id] = {
+                    'future': _SYNC_EXECUTOR.submit(run_sync_script),
+                    'started': datetime.now()
+                }
+                message = 'Synchronization started'
         
         return jsonify({
-            'status': 'success',
-            'message': 'Synchronization completed',
-            'timestamp': datetime.now().isoformat()
-        }), 200
-    
-    except subprocess.TimeoutExpired:
-        log_error("Sync script timeout")
-        return jsonify({'status': 'error', 'message': 'Synchronization timeout'}), 500
+            'status': 'accepted',
+            'message': message,
+            'job_id': job_id,
+            'status_url': url_for('sync_status', job_id=job_id),
+            'timestamp': g.now
+        }), 202
     
     except Exception as e:
         log_error(f"Sync error: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/calendar/sync/status/<job_id>', methods=['GET'])
+def sync_status(job_id):
+    """Get status of a background synchronization job"""
+    if not is_authenticated():
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    
+    with _SYNC_JOBS_LOCK:
+        job = _SYNC_JOBS.get(job_id)
+    
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Sync job not found'}), 404
+    
+    response = {
+        'job_id': job_id,
+        'started_at': job['started'].isoformat(),
+        'timestamp': g.now
+    }
+    
+    if not job['future'].done():
+        response['status'] = 'running'
+        return jsonify(response), 200
+    
+    response.update(job['future'].result())
+    return jsonify(response), 200 if response['status'] == 'success' else 500
+
 @app.route('/api/calendar/master', methods=['GET'])
 def load_master_calendar():
     """Load master_calendar.ics"""
@@ -334,15 +601,7 @@ def load_master_calendar():
                 'events': []
             }), 404
         
-        events = read_ics_file(MASTER_CALENDAR_PATH)
-        
-        return jsonify({
-            'status': 'success',
-            'file': 'master_calendar.ics',
-            'events': events or [],
-            'count': len(events) if events else 0,
-            'timestamp': datetime.now().isoformat()
-        }), 200
+        return calendar_events_response('master_calendar.ics', MASTER_CALENDAR_PATH)
     
     except Exception as e:
         log_error(f"Error loading master calendar: {str(e)}")
@@ -366,15 +625,7 @@ def load_import_calendar():
                 'events': []
             }), 404
         
-        events = read_ics_file(IMPORT_CALENDAR_PATH)
-        
-        return jsonify({
-            'status': 'success',
-            'file': 'import_calendar.ics',
-            'events': events or [],
-            'count': len(events) if events else 0,
-            'timestamp': datetime.now().isoformat()
-        }), 200
+        return calendar_events_response('import_calendar.ics', IMPORT_CALENDAR_PATH)
     
     except Exception as e:
         log_error(f"Error loading import calendar: {str(e)}")
@@ -398,18 +649,10 @@ def load_manual_calendar():
                 'events': [],
                 'count': 0,
                 'message': 'No manual events yet',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': g.now
             }), 200
         
-        events = read_ics_file(MANUAL_CALENDAR_PATH)
-        
-        return jsonify({
-            'status': 'success',
-            'file': 'manual_calendar.ics',
-            'events': events or [],
-            'count': len(events) if events else 0,
-            'timestamp': datetime.now().isoformat()
-        }), 200
+        return calendar_events_response('manual_calendar.ics', MANUAL_CALENDAR_PATH)
     
     except Exception as e:
         log_error(f"Error loading manual calendar: {str(e)}")
@@ -456,7 +699,7 @@ def save_manual_calendar():
             'status': 'success',
             'message': 'Manual events saved',
             'events_saved': len(events),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': g.now
         }), 200
     
     except Exception as e:
@@ -473,40 +716,27 @@ def calendar_status():
         return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
     
     try:
-        status = {
-            'import_calendar': {
-                'exists': file_exists(IMPORT_CALENDAR_PATH),
-                'path': IMPORT_CALENDAR_PATH
-            },
-            'master_calendar': {
-                'exists': file_exists(MASTER_CALENDAR_PATH),
-                'path': MASTER_CALENDAR_PATH
-            },
-            'manual_calendar': {
-                'exists': file_exists(MANUAL_CALENDAR_PATH),
-                'path': MANUAL_CALENDAR_PATH
-            },
-            'sync_script': {
-                'exists': file_exists(SYNC_SCRIPT_PATH),
-                'path': SYNC_SCRIPT_PATH
-            }
-        }
-        
-        # Get file sizes if they exist
-        for key in status:
-            if status[key]['exists']:
-                try:
-                    size = os.path.getsize(status[key]['path'])
-                    status[key]['size_bytes'] = size
-                    status[key]['size_kb'] = round(size / 1024, 2)
-                except:
-                    pass
+        status = {}
+        # Uma só leitura do diretório; o stat de cada DirEntry fica em cache
+        entries = scan_repo()
+        for key, path in (
+            ('import_calendar', IMPORT_CALENDAR_PATH),
+            ('master_calendar', MASTER_CALENDAR_PATH),
+            ('manual_calendar', MANUAL_CALENDAR_PATH),
+            ('sync_script', SYNC_SCRIPT_PATH)
+        ):
+            st = entry_stat_or_none(entries.get(os.path.basename(path)))
+            entry = {'exists': st is not None, 'path': path}
+            if st is not None:
+                entry['size_bytes'] = st.st_size
+                entry['size_kb'] = round(st.st_size / 1024, 2)
+            status[key] = entry
         
         return jsonify({
             'status': 'success',
             'repo_path': REPO_PATH,
             'files': status,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': g.now
         }), 200
     
     except Exception as e:
@@ -537,13 +767,15 @@ def export_calendar():
                 'message': 'Invalid calendar type'
             }), 400
         
-        if not file_exists(filepath):
+        try:
+            st = os.stat(filepath)
+        except FileNotFoundError:
             return jsonify({
                 'status': 'error',
                 'message': f'{calendar_type} calendar not found'
             }), 404
         
-        return send_file(filepath, as_attachment=True, download_name=f'{calendar_type}_calendar.ics')
+        return ics_file_response(filepath, st, download_name=f'{calendar_type}_calendar.ics')
     
     except Exception as e:
         log_error(f"Error exporting calendar: {str(e)}")
@@ -559,28 +791,18 @@ def export_calendar():
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
-    return jsonify({
-        'status': 'error',
-        'message': 'Endpoint not found'
-    }), 404
+    return Response(NOT_FOUND_BODY, status=404, mimetype='application/json')
 
 @app.errorhandler(500)
 def server_error(error):
     """Handle 500 errors"""
-    return jsonify({
-        'status': 'error',
-        'message': 'Internal server error'
-    }), 500
+    return Response(SERVER_ERROR_BODY, status=500, mimetype='application/json')
 
 # ============================================================================
 # HTML TEMPLATES
 # ============================================================================
 
-def login_html(error=None):
-    """Página de login HTML"""
-    error_msg = f'<div class="error-message">{error}</div>' if error else ''
-    
-    return f'''
+LOGIN_TEMPLATE = '''
     <!DOCTYPE html>
     <html lang="pt">
     <head>
@@ -588,45 +810,45 @@ def login_html(error=None):
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>🔐 Login - Calendar Management</title>
         <style>
-            * {{
+            * {
                 margin: 0;
                 padding: 0;
                 box-sizing: border-box;
-            }}
+            }
             
-            body {{
+            body {
                 font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
                 background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
                 min-height: 100vh;
                 display: flex;
                 align-items: center;
                 justify-content: center;
-            }}
+            }
             
-            .login-container {{
+            .login-container {
                 background: white;
                 border-radius: 12px;
                 box-shadow: 0 10px 40px rgba(0, 0, 0, 0.2);
                 padding: 40px;
                 width: 100%;
                 max-width: 400px;
-            }}
+            }
             
-            h1 {{
+            h1 {
                 text-align: center;
                 color: #333;
                 margin-bottom: 10px;
                 font-size: 28px;
-            }}
+            }
             
-            .subtitle {{
+            .subtitle {
                 text-align: center;
                 color: #666;
                 margin-bottom: 30px;
                 font-size: 14px;
-            }}
+            }
             
-            .error-message {{
+            .error-message {
                 background: #fee;
                 border: 1px solid #fcc;
                 border-radius: 6px;
@@ -634,36 +856,36 @@ def login_html(error=None):
                 padding: 12px;
                 margin-bottom: 20px;
                 font-size: 14px;
-            }}
+            }
             
-            .form-group {{
+            .form-group {
                 margin-bottom: 20px;
-            }}
+            }
             
-            label {{
+            label {
                 display: block;
                 color: #333;
                 font-weight: 500;
                 margin-bottom: 8px;
                 font-size: 14px;
-            }}
+            }
             
-            input {{
+            input {
                 width: 100%;
                 padding: 12px;
                 border: 1px solid #ddd;
                 border-radius: 6px;
                 font-size: 14px;
                 transition: border-color 0.3s;
-            }}
+            }
             
-            input:focus {{
+            input:focus {
                 outline: none;
                 border-color: #667eea;
                 box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-            }}
+            }
             
-            button {{
+            button {
                 width: 100%;
                 padding: 12px;
                 background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
@@ -674,15 +896,15 @@ def login_html(error=None):
                 font-weight: 600;
                 cursor: pointer;
                 transition: transform 0.2s;
-            }}
+            }
             
-            button:hover {{
+            button:hover {
                 transform: translateY(-2px);
-            }}
+            }
             
-            button:active {{
+            button:active {
                 transform: translateY(0);
-            }}
+            }
         </style>
     </head>
     <body>
@@ -710,6 +932,41 @@ def login_html(error=None):
     </html>
     '''
 
+# Pré-codificado uma vez; só o erro é formatado por pedido
+_LOGIN_HEAD, _, _LOGIN_TAIL = (part.encode('utf-8') for part in LOGIN_TEMPLATE.partition('{error_msg}'))
+
+def login_html(error=None):
+    """Página de login HTML"""
+    error_msg = f'<div class="error-message">{html.escape(error)}</div>'.encode('utf-8') if error else b''
+    return Response(_LOGIN_HEAD + error_msg + _LOGIN_TAIL, mimetype='text/html')
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+def run_gunicorn():
+    """Serve the app with gunicorn (gthread workers)
+    
+    Equivalent to: gunicorn -k gthread -w 1 --threads 8 -b 0.0.0.0:$PORT calendar_backend:app
+    
+    Default is one worker: sync jobs and their status live in this process,
+    so extra workers (WEB_CONCURRENCY) would answer job polls they never ran.
+    """
+    from gunicorn.app.base import BaseApplication
+    
+    class CalendarBackendServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'0.0.0.0:{PORT}')
+            self.cfg.set('workers', int(os.getenv('WEB_CONCURRENCY', 1)))
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('threads', int(os.getenv('GUNICORN_THREADS', 8)))
+            self.cfg.set('timeout', 30)
+        
+        def load(self):
+            return app
+    
+    CalendarBackendServer().run()
+
 # ============================================================================
 # MAIN
 # ============================================================================
@@ -727,13 +984,11 @@ if __name__ == '__main__':
         Path(log_file).touch()
     
     # Create static directory if it doesn't exist
-    static_dir = os.path.join(os.path.dirname(__file__), 'static')
-    if not os.path.exists(static_dir):
-        os.makedirs(static_dir)
-        log_info(f"Created static directory: {static_dir}")
-    
-    app.run(
-        host='0.0.0.0',
-        port=PORT,
-        debug=(FLASK_ENV == 'development')
-    )
+    if not os.path.exists(STATIC_DIR):
+        os.makedirs(STATIC_DIR)
+        log_info(f"Created static directory: {STATIC_DIR}")
+    
+    if FLASK_ENV == 'development':
+        app.run(host='0.0.0.0', port=PORT, debug=True)
+    else:
+        run_gunicorn()
@@ -0,0 +1,129 @@
+"""
+
+Manual Calendar Editor - Shared helpers
+
+JSON provider and ICS serialization used by app.py, calendar_backend.py
+and app_fase2.py
+
+"""
+
+from flask.json.provider import JSONProvider
+from datetime import date, datetime, timezone
+import os
+import re
+import uuid
+import orjson
+
+# ============================================================================
+# JSON
+# ============================================================================
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson (datetime/date serializados nativamente)"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype='application/json')
+
+# ============================================================================
+# ICS
+# ============================================================================
+
+ICS_ESCAPE_RE = re.compile(r'\\([\\;,nN])')
+
+# Cabeçalho/rodapé fixos de manual_calendar.ics (codificados uma vez)
+MANUAL_CALENDAR_PROLOG = (
+    'BEGIN:VCALENDAR\r\n'
+    'PRODID:-//Rental Manual Calendar//PT\r\n'
+    'VERSION:2.0\r\n'
+    'CALSCALE:GREGORIAN\r\n'
+    'X-WR-CALNAME:Manual Calendar Events\r\n'
+    'X-WR-TIMEZONE:Europe/Lisbon\r\n'
+).encode('utf-8')
+MANUAL_CALENDAR_EPILOG = b'END:VCALENDAR\r\n'
+
+def ics_escape(value):
+    """Escape RFC 5545 TEXT value (quebras de linha, incluindo CR isolado, viram \\n)"""
+    return (str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+                      .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n'))
+
+def ics_unescape(value):
+    """Unescape RFC 5545 TEXT value"""
+    if '\\' not in value:
+        return value
+    return ICS_ESCAPE_RE.sub(lambda m: '\n' if m.group(1) in 'nN' else m.group(1), value)
+
+def ics_format_date(name, value):
+    """Format DTSTART/DTEND line from date/datetime or ISO string"""
+    if isinstance(value, str):
+        if len(value) == 10:
+            value = date.fromisoformat(value)
+        else:
+            value = datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            return f"{name}:{value.astimezone(timezone.utc):%Y%m%dT%H%M%SZ}"
+        return f"{name}:{value:%Y%m%dT%H%M%S}"
+    return f"{name};VALUE=DATE:{value:%Y%m%d}"
+
+def ics_fold(line):
+    """Encode content line, folding at 75 octets (RFC 5545 3.1)"""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return data + b'\r\n'
+
+    parts = []
+    limit = 75
+    while len(data) > limit:
+        cut = limit
+        while (data[cut] & 0xC0) == 0x80:  # não partir caracteres UTF-8
+            cut -= 1
+        parts.append(data[:cut])
+        data = data[cut:]
+        limit = 74  # linhas de continuação começam com espaço
+    parts.append(data)
+    return b'\r\n '.join(parts) + b'\r\n'
+
+def format_manual_event(event_data, created):
+    """Serialize one manual event dict as a VEVENT block (todos os valores de texto escapados)"""
+    uid = event_data.get('uid') or f'manual-{uuid.uuid4().hex}@rental-calendar.com'
+    lines = ['BEGIN:VEVENT', f"SUMMARY:{ics_escape(event_data.get('summary', 'Manual Event'))}"]
+    if event_data.get('dtstart'):
+        lines.append(ics_format_date('DTSTART', event_data['dtstart']))
+    if event_data.get('dtend'):
+        lines.append(ics_format_date('DTEND', event_data['dtend']))
+    lines += [
+        f"UID:{ics_escape(uid)}",
+        f"CATEGORIES:{ics_escape(event_data.get('categories', 'MANUAL'))}",
+        f"DESCRIPTION:{ics_escape(event_data.get('description', ''))}",
+        f"STATUS:{ics_escape(event_data.get('status', 'CONFIRMED'))}",
+        'TRANSP:TRANSPARENT',
+        f'CREATED:{created}',
+        'END:VEVENT'
+    ]
+    return b''.join(ics_fold(line) for line in lines)
+
+# ============================================================================
+# FICHEIROS
+# ============================================================================
+
+def write_file_atomic(filepath, data):
+    """Write bytes to a temp file, fsync once and rename over filepath"""
+    tmp_path = f'{filepath}.tmp'
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, filepath)
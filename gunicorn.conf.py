@@ -0,0 +1,18 @@
+"""
+Configuração gunicorn (produção)
+
+Uso: gunicorn -c gunicorn.conf.py app_fase2:app
+
+Workers gevent: as chamadas ao GitHub e os streams SSE ficam à espera de
+rede sem ocupar um worker inteiro.
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+worker_connections = 1000
+timeout = 30
+keepalive = 5
@@ -14,18 +14,24 @@ Responsabilidades:
 Uso:
 ├─ from email_handler import EmailNotifier
 ├─ notifier = EmailNotifier()
-├─ notifier.send_success(total_events, reserved_count)
-└─ notifier.send_error(error_msg, log_file)
+├─ notifier.send_success(total_events, reserved_count)   → True/False
+├─ notifier.send_error(error_msg, log_file)             → True/False
+└─ notifier.send_error_async(...)                       → Future (sem bloquear)
 
 Versão: 1.1
 Data: 19 de Dezembro de 2025
 """
 
+import gzip
+import io
 import os
 import sys
 import smtplib
 import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 from typing import Optional
 from email.mime.text import MIMEText
@@ -37,6 +43,164 @@ from email import encoders
 
 logger = logging.getLogger(__name__)
 
+# Envio SMTP em background (send_*_async): quem notifica não fica à espera
+# do servidor. As threads só arrancam no primeiro envio assíncrono; não são
+# daemon, por isso os envios pendentes terminam antes de o processo sair.
+_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix='email')
+
+# Log anexado: só o fim do ficheiro, comprimido (sync.log.gz)
+LOG_ATTACH_MAX_BYTES = 256 * 1024
+
+
+# ==================== TEMPLATES ====================
+
+# Esqueletos fixos dos emails; cada envio só preenche os campos variáveis
+
+SUCCESS_TMPL = """Sincronização de calendários concluída com sucesso!
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+✅ STATUS: SUCESSO
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+📊 ESTATÍSTICAS:
+• Total de eventos: {total}
+• Reservas processadas: {reserved}
+• Eventos por reserva: 3 (Reserva + TP Antes + TP Depois)
+
+📅 PLATAFORMAS:
+✅ Airbnb: OK
+✅ Booking: OK
+✅ Vrbo: OK
+
+⏱️ DATA/HORA: {date}
+🕐 TIMESTAMP: {ts}
+
+📁 FICHEIRO: master_calendar.ics
+└─ Agora disponível no repositório (branch main)
+
+🚀 PRÓXIMOS PASSOS:
+1. Verifique o repositório
+2. Sincronize em Airbnb
+3. Sincronize em Booking
+4. Sincronize em Vrbo
+
+📋 DETALHES NO LOG ANEXADO
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Sistema de Sincronização v2.3
+Rental Calendar Master
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+"""
+
+ERROR_TMPL = """ERRO detectado na sincronização de calendários!
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+❌ STATUS: ERRO
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+⚠️ ERRO:
+{error}
+
+⏱️ DATA/HORA: {date}
+🕐 TIMESTAMP: {ts}
+
+📋 LOG (últimas 50 linhas):
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+{log}
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+🔍 POSSÍVEIS CAUSAS:
+• URLs iCal inválidas ou expiradas
+• Problema de conexão de rede
+• Erro nos dados do calendário
+• Configuração de ambiente incorreta
+
+✅ AÇÕES RECOMENDADAS:
+1. Verifique .env com URLs corretas
+2. Verifique se URLs estão acessíveis
+3. Verifique logs anexados (sync.log)
+4. Execute manualmente para debug
+5. Contacte suporte se persistir
+
+📎 FICHEIROS ANEXADOS:
+• sync.log.gz (últimos 256 KB do log)
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Sistema de Sincronização v2.3
+Rental Calendar Master
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+"""
+
+REPORT_TMPL = """Relatório diário de sincronização
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+📊 RELATÓRIO DIÁRIO
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+📈 ESTATÍSTICAS:
+• Total de eventos: {total}
+• Sincronizações bem-sucedidas: {success}
+• Sincronizações com erro: {errors}
+• Tempo médio: {avg:.2f}s
+
+⏱️ DATA: {date}
+🕐 TIMESTAMP: {ts}
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Sistema de Sincronização v2.3
+Rental Calendar Master
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+"""
+
+
+def read_log_tail(log_file: str, lines: int, block_size: int = 8192) -> str:
+    """
+    Lê as últimas linhas de um ficheiro (como tail -n), sem o carregar todo
+
+    Lê blocos a partir do fim até ter linhas suficientes ou chegar ao início.
+    """
+    with open(log_file, 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        data = b''
+        # lines + 1 quebras garantem que a primeira linha devolvida está completa
+        while pos > 0 and data.count(b'\n') <= lines:
+            pos = max(0, pos - block_size)
+            f.seek(pos)
+            data = f.read(end - pos)
+
+    tail = data.decode('utf-8', errors='replace').splitlines(keepends=True)
+    return ''.join(tail[-lines:])
+
+
+def read_tail_bytes(log_file: str, max_bytes: int) -> bytes:
+    """
+    Lê no máximo os últimos max_bytes de um ficheiro
+
+    Se o ficheiro for maior, descarta a primeira linha (incompleta).
+    """
+    with open(log_file, 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = max(0, end - max_bytes)
+        f.seek(pos)
+        data = f.read()
+
+    if pos > 0:
+        data = data[data.find(b'\n') + 1:]
+    return data
+
+
+def _log_send_failure(to_email: str, subject: str, future: Future) -> None:
+    """Regista envios em background falhados (ninguém chama result())"""
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.error(f"❌ Erro ao enviar email '{subject}' para {to_email}: {error}")
+    elif not future.result():
+        # _send_email_sync apanha as exceções e devolve False
+        logger.error(f"❌ Email em background não enviado: '{subject}' para {to_email}")
+
 
 class EmailNotifier:
     """Gerenciador de notificações por email"""
@@ -52,6 +216,10 @@ class EmailNotifier:
         self.enabled = os.getenv('EMAIL_ON_ERROR', 'true').lower() == 'true'
         self.send_log = os.getenv('EMAIL_ATTACH_LOG', 'true').lower() == 'true'
 
+        # Ligação SMTP reutilizada entre envios (TLS + login uma só vez)
+        self._smtp = None
+        self._smtp_lock = threading.Lock()
+
     def validate_config(self) -> bool:
         """Valida se configuração de email está completa"""
         required = [
@@ -69,16 +237,64 @@ class EmailNotifier:
 
         return True
 
+    def _get_smtp(self) -> smtplib.SMTP:
+        """Devolve a ligação SMTP autenticada, abrindo-a se necessário"""
+        if self._smtp is None:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=10)
+            try:
+                server.starttls()
+                server.login(self.email_user, self.email_password)
+            except Exception:
+                server.close()
+                raise
+            self._smtp = server
+        return self._smtp
+
+    def _drop_smtp(self) -> None:
+        """Descarta a ligação SMTP atual (sem falhar se já caiu)"""
+        server, self._smtp = self._smtp, None
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                server.close()
+
+    def close(self) -> None:
+        """Fecha a ligação SMTP persistente"""
+        with self._smtp_lock:
+            self._drop_smtp()
+
     def _send_email(self, to_email: str, subject: str, body: str,
-                    attachments: list = None) -> bool:
+                    attachments: list = None, log_file: str = None) -> Future:
         """
-        Envia email via SMTP
+        Agenda envio de email em background
+
+        Returns:
+            Future cujo resultado é o de _send_email_sync
+        """
+        if not self.enabled:
+            # Desativado não é falha: nada a agendar nem a registar
+            logger.debug("Email desativado")
+            future = Future()
+            future.set_result(False)
+            return future
+
+        future = _EXECUTOR.submit(self._send_email_sync, to_email, subject, body,
+                                  attachments, log_file)
+        future.add_done_callback(partial(_log_send_failure, to_email, subject))
+        return future
+
+    def _send_email_sync(self, to_email: str, subject: str, body: str,
+                         attachments: list = None, log_file: str = None) -> bool:
+        """
+        Envia email via SMTP (bloqueante)
 
         Args:
             to_email: Email destinatário
             subject: Assunto
             body: Corpo da mensagem
             attachments: Lista de caminhos de ficheiros para anexar
+            log_file: Log a anexar comprimido (só o fim, ver _attach_log)
 
         Returns:
             True se sucesso, False se erro
@@ -100,14 +316,22 @@ class EmailNotifier:
             # Anexar ficheiros
             if attachments:
                 for file_path in attachments:
-                    if Path(file_path).exists():
-                        self._attach_file(msg, file_path)
-
-            # Conectar e enviar
-            with smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=10) as server:
-                server.starttls()
-                server.login(self.email_user, self.email_password)
-                server.send_message(msg)
+                    self._attach_file(msg, file_path)
+            if log_file:
+                self._attach_log(msg, log_file)
+
+            # Enviar pela ligação persistente; se o servidor a fechou
+            # entretanto (timeout de inatividade), religar e tentar uma vez
+            with self._smtp_lock:
+                try:
+                    try:
+                        self._get_smtp().send_message(msg)
+                    except smtplib.SMTPServerDisconnected:
+                        self._drop_smtp()
+                        self._get_smtp().send_message(msg)
+                except Exception:
+                    self._drop_smtp()
+                    raise
 
             logger.info(f"✅ Email enviado para {to_email}")
             return True
@@ -123,22 +347,76 @@ class EmailNotifier:
             return False
 
     def _attach_file(self, msg: MIMEMultipart, file_path: str) -> None:
-        """Anexa ficheiro a mensagem"""
+        """Anexa ficheiro a mensagem (ignora ficheiros inexistentes)"""
         try:
             file_path = Path(file_path)
-            with open(file_path, 'rb') as attachment:
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(attachment.read())
-                encoders.encode_base64(part)
-                part.add_header(
-                    'Content-Disposition',
-                    f'attachment; filename= {file_path.name}'
-                )
-                msg.attach(part)
+            data = file_path.read_bytes()
+        except FileNotFoundError:
+            logger.debug(f"Anexo inexistente: {file_path}")
+            return
+        except Exception as e:
+            logger.error(f"Erro ao anexar {file_path}: {e}")
+            return
+
+        try:
+            part = MIMEBase('application', 'octet-stream')
+            part.set_payload(data)
+            encoders.encode_base64(part)
+            part.add_header(
+                'Content-Disposition',
+                f'attachment; filename= {file_path.name}'
+            )
+            msg.attach(part)
             logger.debug(f"Ficheiro anexado: {file_path.name}")
         except Exception as e:
             logger.error(f"Erro ao anexar {file_path}: {e}")
 
+    def _attach_log(self, msg: MIMEMultipart, log_file: str) -> None:
+        """Anexa o fim do log comprimido em gzip (ignora log inexistente)"""
+        try:
+            tail = read_tail_bytes(log_file, LOG_ATTACH_MAX_BYTES)
+        except FileNotFoundError:
+            logger.debug(f"Log inexistente: {log_file}")
+            return
+        except Exception as e:
+            logger.error(f"Erro ao ler {log_file}: {e}")
+            return
+
+        buf = io.BytesIO()
+        with gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=6) as gz:
+            gz.write(tail)
+
+        filename = Path(log_file).name + '.gz'
+        part = MIMEBase('application', 'gzip')
+        part.set_payload(buf.getvalue())
+        encoders.encode_base64(part)
+        part.add_header('Content-Disposition', f'attachment; filename= {filename}')
+        msg.attach(part)
+        logger.debug(f"Log anexado: {filename} ({len(tail)} bytes antes de comprimir)")
+
+    def _success_email(self, total_events: int, reserved_count: int,
+                       log_file: str) -> dict:
+        """Argumentos de _send_email para o email de sucesso"""
+        current_date = datetime.now().strftime('%d/%m/%Y às %H:%M:%S')
+        current_timestamp = datetime.utcnow().isoformat() + 'Z'
+
+        subject = '✅ Sincronização Calendários Completa'
+
+        body = SUCCESS_TMPL.format(
+            total=total_events,
+            reserved=reserved_count,
+            date=current_date,
+            ts=current_timestamp,
+        )
+
+        # Log inexistente é ignorado em _attach_log
+        return dict(
+            to_email=self.notification_email,
+            subject=subject,
+            body=body,
+            log_file=log_file if self.send_log else None
+        )
+
     def send_success(self, total_events: int, reserved_count: int,
                      log_file: str = 'sync.log') -> bool:
         """
@@ -150,58 +428,43 @@ class EmailNotifier:
             log_file: Caminho do ficheiro de log
 
         Returns:
-            True se sucesso
+            True se sucesso, False se erro
         """
-        current_date = datetime.now().strftime('%d/%m/%Y às %H:%M:%S')
-        current_timestamp = datetime.utcnow().isoformat() + 'Z'
-
-        subject = '✅ Sincronização Calendários Completa'
-
-        body = f"""Sincronização de calendários concluída com sucesso!
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-✅ STATUS: SUCESSO
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-📊 ESTATÍSTICAS:
-• Total de eventos: {total_events}
-• Reservas processadas: {reserved_count}
-• Eventos por reserva: 3 (Reserva + TP Antes + TP Depois)
-
-📅 PLATAFORMAS:
-✅ Airbnb: OK
-✅ Booking: OK
-✅ Vrbo: OK
-
-⏱️ DATA/HORA: {current_date}
-🕐 TIMESTAMP: {current_timestamp}
+        return self._send_email_sync(**self._success_email(total_events, reserved_count, log_file))
 
-📁 FICHEIRO: master_calendar.ics
-└─ Agora disponível no repositório (branch main)
+    def send_success_async(self, total_events: int, reserved_count: int,
+                           log_file: str = 'sync.log') -> Future:
+        """Como send_success, em background (Future com o bool)"""
+        return self._send_email(**self._success_email(total_events, reserved_count, log_file))
 
-🚀 PRÓXIMOS PASSOS:
-1. Verifique o repositório
-2. Sincronize em Airbnb
-3. Sincronize em Booking
-4. Sincronize em Vrbo
+    def _error_email(self, error_msg: str, log_file: str) -> dict:
+        """Argumentos de _send_email para o email de erro"""
+        current_date = datetime.now().strftime('%d/%m/%Y às %H:%M:%S')
+        current_timestamp = datetime.utcnow().isoformat() + 'Z'
 
-📋 DETALHES NO LOG ANEXADO
+        subject = f'❌ Erro na Sincronização Calendários - {current_date}'
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-Sistema de Sincronização v2.3
-Rental Calendar Master
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-"""
+        # Ler log para contexto
+        log_content = ""
+        try:
+            log_content = read_log_tail(log_file, 50)  # Últimas 50 linhas
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log_content = f"Erro ao ler log: {e}"
 
-        attachments = []
-        if self.send_log and Path(log_file).exists():
-            attachments.append(log_file)
+        body = ERROR_TMPL.format(
+            error=error_msg,
+            log=log_content,
+            date=current_date,
+            ts=current_timestamp,
+        )
 
-        return self._send_email(
-            self.notification_email,
-            subject,
-            body,
-            attachments
+        return dict(
+            to_email=self.error_email,
+            subject=subject,
+            body=body,
+            log_file=log_file
         )
 
     def send_error(self, error_msg: str, log_file: str = 'sync.log') -> bool:
@@ -213,71 +476,34 @@ Rental Calendar Master
             log_file: Caminho do ficheiro de log
 
         Returns:
-            True se sucesso
+            True se sucesso, False se erro
         """
-        current_date = datetime.now().strftime('%d/%m/%Y às %H:%M:%S')
-        current_timestamp = datetime.utcnow().isoformat() + 'Z'
-
-        subject = f'❌ Erro na Sincronização Calendários - {current_date}'
+        return self._send_email_sync(**self._error_email(error_msg, log_file))
 
-        # Ler log para contexto
-        log_content = ""
-        if Path(log_file).exists():
-            try:
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    log_lines = f.readlines()
-                    log_content = ''.join(log_lines[-50:])  # Últimas 50 linhas
-            except Exception as e:
-                log_content = f"Erro ao ler log: {e}"
+    def send_error_async(self, error_msg: str, log_file: str = 'sync.log') -> Future:
+        """Como send_error, em background (Future com o bool)"""
+        return self._send_email(**self._error_email(error_msg, log_file))
 
-        body = f"""ERRO detectado na sincronização de calendários!
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-❌ STATUS: ERRO
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-⚠️ ERRO:
-{error_msg}
-
-⏱️ DATA/HORA: {current_date}
-🕐 TIMESTAMP: {current_timestamp}
-
-📋 LOG (últimas 50 linhas):
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-{log_content}
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-🔍 POSSÍVEIS CAUSAS:
-• URLs iCal inválidas ou expiradas
-• Problema de conexão de rede
-• Erro nos dados do calendário
-• Configuração de ambiente incorreta
-
-✅ AÇÕES RECOMENDADAS:
-1. Verifique .env com URLs corretas
-2. Verifique se URLs estão acessíveis
-3. Verifique logs anexados (sync.log)
-4. Execute manualmente para debug
-5. Contacte suporte se persistir
-
-📎 FICHEIROS ANEXADOS:
-• sync.log (completo)
+    def _report_email(self, report_data: dict) -> dict:
+        """Argumentos de _send_email para o relatório diário"""
+        current_date = datetime.now().strftime('%d/%m/%Y')
+        current_timestamp = datetime.utcnow().isoformat() + 'Z'
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-Sistema de Sincronização v2.3
-Rental Calendar Master
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-"""
+        subject = f'📊 Relatório Sincronização - {current_date}'
 
-        attachments = []
-        if Path(log_file).exists():
-            attachments.append(log_file)
+        body = REPORT_TMPL.format(
+            total=report_data.get('total_events', 0),
+            success=report_data.get('success_count', 0),
+            errors=report_data.get('error_count', 0),
+            avg=report_data.get('avg_sync_time', 0),
+            date=current_date,
+            ts=current_timestamp,
+        )
 
-        return self._send_email(
-            self.error_email,
-            subject,
-            body,
-            attachments
+        return dict(
+            to_email=self.notification_email,
+            subject=subject,
+            body=body
         )
 
     def send_daily_report(self, report_data: dict) -> bool:
@@ -292,38 +518,15 @@ Rental Calendar Master
                     'error_count': int,
                     'avg_sync_time': float,
                 }
-        """
-        current_date = datetime.now().strftime('%d/%m/%Y')
-        current_timestamp = datetime.utcnow().isoformat() + 'Z'
-
-        subject = f'📊 Relatório Sincronização - {current_date}'
-
-        body = f"""Relatório diário de sincronização
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-📊 RELATÓRIO DIÁRIO
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-📈 ESTATÍSTICAS:
-• Total de eventos: {report_data.get('total_events', 0)}
-• Sincronizações bem-sucedidas: {report_data.get('success_count', 0)}
-• Sincronizações com erro: {report_data.get('error_count', 0)}
-• Tempo médio: {report_data.get('avg_sync_time', 0):.2f}s
 
-⏱️ DATA: {current_date}
-🕐 TIMESTAMP: {current_timestamp}
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-Sistema de Sincronização v2.3
-Rental Calendar Master
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-"""
+        Returns:
+            True se sucesso, False se erro
+        """
+        return self._send_email_sync(**self._report_email(report_data))
 
-        return self._send_email(
-            self.notification_email,
-            subject,
-            body
-        )
+    def send_daily_report_async(self, report_data: dict) -> Future:
+        """Como send_daily_report, em background (Future com o bool)"""
+        return self._send_email(**self._report_email(report_data))
 
 
 # ==================== TESTE ====================
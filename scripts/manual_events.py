@@ -14,14 +14,159 @@ Versão: 1.0
 Data: Janeiro 2026
 """
 
-import json
 import os
-from datetime import datetime, date
-from typing import List, Dict, Optional
+import sys
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, date, timezone
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
-from icalendar import Calendar, Event
+from icalendar import Calendar
+import orjson
+import threading
+import time
 import uuid
 
+# Helpers ICS partilhados com as apps web (calendar_common na raiz do repo)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from calendar_common import ics_escape, ics_fold
+
+# Eventos já lidos por ficheiro JSON: {path: ((mtime_ns, size), events)}
+# Partilhado entre instâncias; invalidado quando o ficheiro muda no disco
+_EVENTS_CACHE: Dict[Path, Tuple[Tuple[int, int], List[Dict]]] = {}
+
+
+# Escritas de flush(): JSON e ICS gravados em simultâneo
+_WRITE_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix='manual-write')
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Escrever num ficheiro temporário e substituir path (os.replace atómico)"""
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+# ICS gerado diretamente (icalendar só é usado para importar)
+ICS_HEADER = (
+    'BEGIN:VCALENDAR\r\n'
+    'VERSION:2.0\r\n'
+    'PRODID:-//Calendário Sync//Manual Events//PT\r\n'
+    'METHOD:PUBLISH\r\n'
+    'X-WR-CALNAME:Manual Calendar\r\n'
+    'X-WR-TIMEZONE:Europe/Lisbon\r\n'
+).encode('utf-8')
+ICS_FOOTER = b'END:VCALENDAR\r\n'
+
+# Linhas fixas de cada VEVENT (curtas, sem fold); o fim é formatado uma vez por sync
+EVENT_TYPE_EXTRA = {
+    'HIDE_EVENT': b'CLASS:PRIVATE\r\n',
+    'FORCE_AVAILABILITY': b'TRANSP:TRANSPARENT\r\n'
+}
+EVENT_TAIL_TMPL = 'CREATED:{stamp}\r\nLAST-MODIFIED:{stamp}\r\nEND:VEVENT\r\n'
+
+
+@lru_cache(maxsize=4096)
+def parse_iso(value: str) -> datetime:
+    """datetime.fromisoformat com cache (as mesmas datas repetem-se entre eventos e consultas)"""
+    return datetime.fromisoformat(value)
+
+
+def ics_datetime(value: str) -> str:
+    """Data ISO -> DATE-TIME ICS (com fuso: convertido para UTC)"""
+    dt = parse_iso(value)
+    if dt.tzinfo is not None:
+        return f'{dt.astimezone(timezone.utc):%Y%m%dT%H%M%SZ}'
+    return f'{dt:%Y%m%dT%H%M%S}'
+
+
+# Aleatoriedade para IDs lida do sistema em blocos (um os.urandom por ~400 IDs)
+_ID_RANDOM_BLOCK = 4096
+_id_random = b''
+_id_random_pos = 0
+_id_lock = threading.Lock()
+
+
+def new_event_id() -> str:
+    """
+    Novo ID de evento no formato UUIDv7 (RFC 9562)
+
+    Os 48 bits iniciais são o timestamp Unix em ms, por isso os IDs ordenam
+    por data de criação; os restantes 74 bits vêm do bloco de aleatoriedade.
+    """
+    global _id_random, _id_random_pos
+    with _id_lock:
+        if _id_random_pos + 10 > len(_id_random):
+            _id_random = os.urandom(_ID_RANDOM_BLOCK)
+            _id_random_pos = 0
+        rand = int.from_bytes(_id_random[_id_random_pos:_id_random_pos + 10], 'big')
+        _id_random_pos += 10
+    
+    value = (time.time_ns() // 1_000_000) << 80 | rand
+    value = (value & ~(0xF << 76)) | (0x7 << 76)   # versão 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)   # variante RFC
+    return str(uuid.UUID(int=value))
+
+
+def _event_date(value: Optional[str]) -> Optional[date]:
+    """Data (dia) de um campo ISO do evento; None se ausente ou inválido"""
+    if not value:
+        return None
+    try:
+        return parse_iso(value).date()
+    except ValueError:
+        return None
+
+
+class DateIndex:
+    """
+    Índice de eventos por data (início ordenado + máximo acumulado dos fins)
+
+    Um evento afeta a data alvo se for BLOCK_DATE com início nessa data, ou
+    se o intervalo [início, fim] a contiver. Só eventos com início <= alvo
+    podem coincidir (bisect); entre esses, o máximo acumulado dos fins diz
+    a partir de que posição algum intervalo ainda chega ao alvo.
+    """
+    
+    def __init__(self, events: List[Dict]):
+        self.starts = [_event_date(e.get('date_start')) for e in events]
+        self.ends = [_event_date(e.get('date_end')) for e in events]
+        self.types = [e['type'] for e in events]
+        
+        self.order = sorted((i for i, start in enumerate(self.starts) if start is not None),
+                            key=self.starts.__getitem__)
+        self.sorted_starts = [self.starts[i] for i in self.order]
+        
+        self.max_ends = []
+        running = date.min
+        for i in self.order:
+            end = self.ends[i]
+            if end is not None and end > running:
+                running = end
+            self.max_ends.append(running)
+    
+    def lookup(self, target: date) -> List[int]:
+        """Índices (em self.events, por ordem) dos eventos que afetam target"""
+        hi = bisect_right(self.sorted_starts, target)
+        # Antes de lo nenhum intervalo chega ao alvo; BLOCK_DATE do próprio dia
+        # começam em bisect_left(target)
+        lo = min(bisect_left(self.max_ends, target, 0, hi),
+                 bisect_left(self.sorted_starts, target, 0, hi))
+        
+        matching = []
+        for pos in range(lo, hi):
+            i = self.order[pos]
+            start, end = self.starts[i], self.ends[i]
+            if start == target and self.types[i] == 'BLOCK_DATE':
+                matching.append(i)
+            elif end is not None and start <= target <= end:
+                matching.append(i)
+        
+        matching.sort()
+        return matching
+
+
 class ManualCalendarManager:
     """Gestor de eventos manuais do calendário"""
     
@@ -40,78 +185,158 @@ class ManualCalendarManager:
         
         # Carregar eventos existentes
         self.events = self._load_events()
+        self._reindex()
+        
+        # Alterações pendentes de gravação (ver batch/flush)
+        self._dirty = False
+        self._batch_depth = 0
+        
+        # Datas já convertidas e índice ordenado por início (ver _date_index)
+        self._dates: Optional[DateIndex] = None
     
     # ========================================================================
     # CARREGAMENTO E ARMAZENAMENTO
     # ========================================================================
     
     def _load_events(self) -> List[Dict]:
-        """Carregar eventos do ficheiro JSON"""
-        if self.json_file.exists():
+        """Carregar eventos do ficheiro JSON (cache por mtime/tamanho)"""
+        try:
+            st = self.json_file.stat()
+        except FileNotFoundError:
+            return []
+        
+        key = (st.st_mtime_ns, st.st_size)
+        cached = _EVENTS_CACHE.get(self.json_file)
+        if cached is None or cached[0] != key:
             try:
-                with open(self.json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return data.get('events', [])
+                data = orjson.loads(self.json_file.read_bytes())
             except Exception as e:
                 print(f"Erro ao carregar eventos: {e}")
                 return []
-        return []
+            cached = (key, data.get('events', []))
+            _EVENTS_CACHE[self.json_file] = cached
+        
+        # Cópia: as instâncias alteram a lista e os eventos in-place
+        return [dict(event) for event in cached[1]]
+    
+    def _reindex(self) -> None:
+        """Reconstruir o índice id -> posição em self.events"""
+        self._by_id: Dict[str, int] = {}
+        for i, event in enumerate(self.events):
+            # Com IDs duplicados (import ICS) prevalece o primeiro, como na pesquisa linear
+            self._by_id.setdefault(event['id'], i)
+    
+    def _json_bytes(self) -> bytes:
+        """Serializar eventos para o JSON de trabalho"""
+        data = {
+            'version': '1.0',
+            'last_modified': datetime.now().isoformat(),
+            'events': self.events
+        }
+        # Cópia de trabalho compacta; export_to_json mantém o formato legível
+        return orjson.dumps(data)
+    
+    def _remember_saved(self) -> None:
+        """Atualizar a cache de leitura com o JSON acabado de gravar"""
+        st = self.json_file.stat()
+        _EVENTS_CACHE[self.json_file] = ((st.st_mtime_ns, st.st_size), [dict(event) for event in self.events])
     
     def _save_events(self) -> None:
         """Guardar eventos em JSON"""
         try:
-            data = {
-                'version': '1.0',
-                'last_modified': datetime.now().isoformat(),
-                'events': self.events
-            }
-            with open(self.json_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            write_atomic(self.json_file, self._json_bytes())
+            self._remember_saved()
         except Exception as e:
             print(f"Erro ao guardar eventos: {e}")
     
+    def _ics_bytes(self) -> bytes:
+        """Gerar o ICS dos eventos (escrita direta, sem o modelo icalendar)"""
+        stamp = f'{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}'
+        tail = EVENT_TAIL_TMPL.format(stamp=stamp).encode('ascii')
+        
+        buf = bytearray(ICS_HEADER)
+        for event in self.events:
+            event_type = event['type']
+            summary = f"[{event_type}] {event['title']}"
+            buf += b'BEGIN:VEVENT\r\n'
+            buf += ics_fold(f"UID:{ics_escape(event['id'])}")
+            buf += ics_fold(f"SUMMARY:{ics_escape(summary)}")
+            buf += ics_fold(f"DESCRIPTION:{ics_escape(event.get('description', ''))}")
+            
+            # Adicionar datas
+            if 'date_start' in event:
+                buf += f"DTSTART:{ics_datetime(event['date_start'])}\r\n".encode('ascii')
+            if 'date_end' in event:
+                buf += f"DTEND:{ics_datetime(event['date_end'])}\r\n".encode('ascii')
+            
+            # Tipo como property customizada; CLASS/TRANSP conforme o tipo
+            buf += ics_fold(f"X-EVENT-TYPE:{ics_escape(event_type)}")
+            buf += EVENT_TYPE_EXTRA.get(event_type, b'')
+            buf += tail
+        buf += ICS_FOOTER
+        return bytes(buf)
+    
     def _sync_to_ics(self) -> None:
         """Sincronizar eventos JSON para ICS"""
         try:
-            cal = Calendar()
-            cal.add('prodid', '-//Calendário Sync//Manual Events//PT')
-            cal.add('version', '2.0')
-            cal.add('method', 'PUBLISH')
-            cal.add('x-wr-calname', 'Manual Calendar')
-            cal.add('x-wr-timezone', 'Europe/Lisbon')
-            
-            for event in self.events:
-                ical_event = Event()
-                ical_event.add('uid', event['id'])
-                ical_event.add('summary', f"[{event['type']}] {event['title']}")
-                ical_event.add('description', event.get('description', ''))
-                
-                # Adicionar datas
-                if 'date_start' in event:
-                    ical_event.add('dtstart', datetime.fromisoformat(event['date_start']))
-                if 'date_end' in event:
-                    ical_event.add('dtend', datetime.fromisoformat(event['date_end']))
-                
-                # Adicionar tipo como property customizada
-                ical_event.add('x-event-type', event['type'])
-                
-                # CLASS baseado no tipo
-                if event['type'] == 'HIDE_EVENT':
-                    ical_event.add('class', 'PRIVATE')
-                elif event['type'] == 'FORCE_AVAILABILITY':
-                    ical_event.add('transp', 'TRANSPARENT')
-                
-                ical_event.add('created', datetime.now())
-                ical_event.add('last-modified', datetime.now())
-                
-                cal.add_component(ical_event)
-            
-            # Guardar ficheiro ICS
-            with open(self.ics_file, 'wb') as f:
-                f.write(cal.to_ical())
+            write_atomic(self.ics_file, self._ics_bytes())
+        except Exception as e:
+            print(f"Erro ao sincronizar para ICS: {e}")
+    
+    def _mark_dirty(self) -> None:
+        """Marcar alterações; grava já, exceto dentro de batch()"""
+        self._dirty = True
+        self._dates = None
+        if not self._batch_depth:
+            self.flush()
+    
+    def flush(self) -> None:
+        """Gravar JSON e ICS uma única vez se houver alterações pendentes"""
+        if not self._dirty:
+            return
         
+        # Buffers montados aqui; os dois ficheiros são independentes,
+        # por isso as escritas correm em paralelo
+        json_write = ics_write = None
+        try:
+            json_write = _WRITE_EXECUTOR.submit(write_atomic, self.json_file, self._json_bytes())
+        except Exception as e:
+            print(f"Erro ao guardar eventos: {e}")
+        try:
+            ics_write = _WRITE_EXECUTOR.submit(write_atomic, self.ics_file, self._ics_bytes())
         except Exception as e:
             print(f"Erro ao sincronizar para ICS: {e}")
+        
+        if json_write is not None:
+            try:
+                json_write.result()
+                self._remember_saved()
+            except Exception as e:
+                print(f"Erro ao guardar eventos: {e}")
+        if ics_write is not None:
+            try:
+                ics_write.result()
+            except Exception as e:
+                print(f"Erro ao sincronizar para ICS: {e}")
+        self._dirty = False
+    
+    @contextmanager
+    def batch(self):
+        """
+        Agrupar várias operações numa só gravação
+        
+        Exemplo:
+            with manager.batch():
+                for item in items:
+                    manager.create_event(...)
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
     
     # ========================================================================
     # CRUD - CREATE
@@ -143,14 +368,15 @@ class ManualCalendarManager:
         if event_type not in valid_types:
             raise ValueError(f"Tipo inválido: {event_type}")
         
-        # Criar evento
+        # Criar evento (created_at e updated_at com o mesmo instante)
+        now = datetime.now().isoformat()
         event = {
-            'id': str(uuid.uuid4()),
+            'id': new_event_id(),
             'type': event_type,
             'title': title,
             'description': description,
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat()
+            'created_at': now,
+            'updated_at': now
         }
         
         if date_start:
@@ -160,8 +386,8 @@ class ManualCalendarManager:
         
         # Adicionar à lista
         self.events.append(event)
-        self._save_events()
-        self._sync_to_ics()
+        self._by_id.setdefault(event['id'], len(self.events) - 1)
+        self._mark_dirty()
         
         return event
     
@@ -171,10 +397,8 @@ class ManualCalendarManager:
     
     def get_event(self, event_id: str) -> Optional[Dict]:
         """Obter evento por ID"""
-        for event in self.events:
-            if event['id'] == event_id:
-                return event
-        return None
+        i = self._by_id.get(event_id)
+        return self.events[i] if i is not None else None
     
     def get_all_events(self) -> List[Dict]:
         """Obter todos os eventos"""
@@ -184,22 +408,16 @@ class ManualCalendarManager:
         """Obter eventos por tipo"""
         return [e for e in self.events if e['type'] == event_type]
     
+    def _date_index(self) -> 'DateIndex':
+        """Índice de datas, reconstruído só após alterações"""
+        if self._dates is None:
+            self._dates = DateIndex(self.events)
+        return self._dates
+    
     def get_events_by_date(self, target_date: str) -> List[Dict]:
         """Obter eventos que afetam uma data específica"""
-        target = datetime.fromisoformat(target_date).date()
-        matching = []
-        
-        for event in self.events:
-            if 'date_start' in event:
-                start = datetime.fromisoformat(event['date_start']).date()
-                if event['type'] == 'BLOCK_DATE' and start == target:
-                    matching.append(event)
-                elif 'date_end' in event:
-                    end = datetime.fromisoformat(event['date_end']).date()
-                    if start <= target <= end:
-                        matching.append(event)
-        
-        return matching
+        target = parse_iso(target_date).date()
+        return [self.events[i] for i in self._date_index().lookup(target)]
     
     # ========================================================================
     # CRUD - UPDATE
@@ -219,8 +437,7 @@ class ManualCalendarManager:
         
         event['updated_at'] = datetime.now().isoformat()
         
-        self._save_events()
-        self._sync_to_ics()
+        self._mark_dirty()
         
         return event
     
@@ -230,13 +447,15 @@ class ManualCalendarManager:
     
     def delete_event(self, event_id: str) -> bool:
         """Deletar evento"""
-        for i, event in enumerate(self.events):
-            if event['id'] == event_id:
-                self.events.pop(i)
-                self._save_events()
-                self._sync_to_ics()
-                return True
-        return False
+        i = self._by_id.get(event_id)
+        if i is None:
+            return False
+        
+        # pop (não swap) para manter a ordem; a reescrita dos ficheiros já é O(N)
+        self.events.pop(i)
+        self._reindex()
+        self._mark_dirty()
+        return True
     
     # ========================================================================
     # EXPORT/IMPORT
@@ -249,7 +468,7 @@ class ManualCalendarManager:
             'last_modified': datetime.now().isoformat(),
             'events': self.events
         }
-        return json.dumps(data, ensure_ascii=False, indent=2)
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
     
     def export_to_ics(self) -> str:
         """Exportar eventos para ICS string"""
@@ -260,10 +479,10 @@ class ManualCalendarManager:
     def import_from_json(self, json_data: str) -> bool:
         """Importar eventos de JSON string"""
         try:
-            data = json.loads(json_data)
+            data = orjson.loads(json_data)
             self.events = data.get('events', [])
-            self._save_events()
-            self._sync_to_ics()
+            self._reindex()
+            self._mark_dirty()
             return True
         except Exception as e:
             print(f"Erro ao importar JSON: {e}")
@@ -273,25 +492,36 @@ class ManualCalendarManager:
         """Importar eventos de ICS"""
         try:
             cal = Calendar.from_ical(ics_data)
+            now = datetime.now().isoformat()
+            
+            # Lista local: nada é adicionado se o ICS falhar a meio
+            imported = []
+            for component in cal.walk('VEVENT'):
+                event = {
+                    'id': str(component.get('uid') or new_event_id()),
+                    'title': str(component.get('summary', 'Untitled')),
+                    'type': str(component.get('x-event-type', 'BLOCK_DATE')),
+                    'created_at': now,
+                    'updated_at': now
+                }
+                
+                # Campos opcionais só quando preenchidos
+                description = component.get('description')
+                if description:
+                    event['description'] = str(description)
+                if 'dtstart' in component:
+                    event['date_start'] = component.decoded('dtstart').isoformat()
+                if 'dtend' in component:
+                    event['date_end'] = component.decoded('dtend').isoformat()
+                
+                imported.append(event)
             
-            for component in cal.walk():
-                if component.name == "VEVENT":
-                    event = {
-                        'id': str(component.get('uid', str(uuid.uuid4()))),
-                        'title': str(component.get('summary', 'Untitled')),
-                        'description': str(component.get('description', '')),
-                        'type': str(component.get('x-event-type', 'BLOCK_DATE')),
-                        'date_start': str(component.get('dtstart', '')),
-                        'date_end': str(component.get('dtend', '')),
-                        'created_at': datetime.now().isoformat(),
-                        'updated_at': datetime.now().isoformat()
-                    }
-                    
-                    # Remover campos vazios
-                    event = {k: v for k, v in event.items() if v}
-                    self.events.append(event)
+            offset = len(self.events)
+            self.events.extend(imported)
+            for i, event in enumerate(imported, offset):
+                self._by_id.setdefault(event['id'], i)
             
-            self._save_events()
+            self._mark_dirty()
             return True
         except Exception as e:
             print(f"Erro ao importar ICS: {e}")
@@ -322,8 +552,8 @@ class ManualCalendarManager:
     def clear_all(self) -> None:
         """Limpar todos os eventos"""
         self.events = []
-        self._save_events()
-        self._sync_to_ics()
+        self._by_id = {}
+        self._mark_dirty()
 
 
 # ============================================================================
@@ -12,9 +12,11 @@ Date: January 8, 2026
 Developer: PBRANDÃO + AI
 """
 
+import json
 import os
 import sys
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, date
 from pathlib import Path
 from typing import List, Dict, Optional, Set
@@ -22,6 +24,7 @@ from typing import List, Dict, Optional, Set
 try:
     from icalendar import Calendar, Event
     import requests
+    from requests.adapters import HTTPAdapter
     from dotenv import load_dotenv
     import pytz
 except ImportError as e:
@@ -42,19 +45,42 @@ BOOKING_ICAL_URL = os.getenv('BOOKING_ICAL_URL', '')
 VRBO_ICAL_URL = os.getenv('VRBO_ICAL_URL', '')
 BUFFER_DAYS_BEFORE = int(os.getenv('BUFFER_DAYS_BEFORE', 1))
 BUFFER_DAYS_AFTER = int(os.getenv('BUFFER_DAYS_AFTER', 1))
+BUFFER_BEFORE = timedelta(days=BUFFER_DAYS_BEFORE)
+BUFFER_AFTER = timedelta(days=BUFFER_DAYS_AFTER)
 
 # File paths
 IMPORT_CALENDAR_PATH = os.path.join(REPO_PATH, 'import_calendar.ics')
 MASTER_CALENDAR_PATH = os.path.join(REPO_PATH, 'master_calendar.ics')
 MANUAL_CALENDAR_PATH = os.path.join(REPO_PATH, 'manual_calendar.ics')
-
-# Logging
+# UIDs bloqueados já extraídos do manual_calendar.ics, válidos para (mtime, tamanho)
+MANUAL_CACHE_PATH = os.path.join(REPO_PATH, '.manual_calendar.cache.json')
+
+# Feeds iCal (descarregados em paralelo)
+CALENDAR_FEEDS = {
+    'AIRBNB': AIRBNB_ICAL_URL,
+    'BOOKING': BOOKING_ICAL_URL,
+    'VRBO': VRBO_ICAL_URL,
+}
+
+# Exportação ICS
+CALENDAR_FOOTER = b'END:VCALENDAR\r\n'
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Sessão HTTP partilhada pelos downloads (keep-alive / TLS reutilizados)
+http_session = requests.Session()
+_http_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+http_session.mount('https://', _http_adapter)
+http_session.mount('http://', _http_adapter)
+
+# Logging: sync.log com timestamp; consola só com o nível (como os antigos prints)
+_console_handler = logging.StreamHandler()
+_console_handler.setFormatter(logging.Formatter('[%(levelname)s] %(message)s'))
 logging.basicConfig(
     level=logging.INFO,
     format='[%(asctime)s] [%(levelname)s] %(message)s',
     handlers=[
         logging.FileHandler(os.path.join(REPO_PATH, 'sync.log'), encoding='utf-8'),
-        logging.StreamHandler()
+        _console_handler
     ]
 )
 logger = logging.getLogger(__name__)
@@ -94,22 +120,18 @@ def normalize_uid(uid: str) -> str:
 def log_info(msg):
     """Log info"""
     logger.info(msg)
-    print(f"[INFO] {msg}")
 
 def log_warning(msg):
     """Log warning"""
     logger.warning(msg)
-    print(f"[WARNING] {msg}")
 
 def log_error(msg):
     """Log error"""
     logger.error(msg)
-    print(f"[ERROR] {msg}")
 
 def log_success(msg):
     """Log success"""
-    logger.info(msg)
-    print(f"[SUCCESS] ✅ {msg}")
+    logger.info(f"✅ {msg}")
 
 # ============================================================================
 # DOWNLOAD & IMPORT
@@ -123,13 +145,14 @@ def download_calendar(url: str, source: str) -> Optional[Calendar]:
             return None
 
         log_info(f"[IMPORT] Downloading {source}...")
-        response = requests.get(url, timeout=30)
+        response = http_session.get(url, timeout=30)
         response.raise_for_status()
         
         cal = Calendar.from_ical(response.content)
         
-        events = [c for c in cal.walk() if c.name == "VEVENT"]
-        log_success(f"Downloaded {len(events)} events from {source}")
+        # Contagem sem percorrer a árvore toda (eventos são filhos diretos)
+        event_count = sum(1 for c in cal.subcomponents if c.name == "VEVENT")
+        log_success(f"Downloaded {event_count} events from {source}")
         
         return cal
 
@@ -138,14 +161,15 @@ def download_calendar(url: str, source: str) -> Optional[Calendar]:
         return None
 
 def fetch_all_calendars() -> Optional[Dict[str, Optional[Calendar]]]:
-    """Download all 3 calendars"""
+    """Download all 3 calendars (em paralelo: total ~ o feed mais lento)"""
     log_info("STEP 1: Importing calendars...")
     
-    calendars = {
-        'AIRBNB': download_calendar(AIRBNB_ICAL_URL, 'AIRBNB'),
-        'BOOKING': download_calendar(BOOKING_ICAL_URL, 'BOOKING'),
-        'VRBO': download_calendar(VRBO_ICAL_URL, 'VRBO'),
-    }
+    with ThreadPoolExecutor(max_workers=len(CALENDAR_FEEDS)) as executor:
+        futures = {
+            source: executor.submit(download_calendar, url, source)
+            for source, url in CALENDAR_FEEDS.items()
+        }
+        calendars = {source: future.result() for source, future in futures.items()}
     
     if all(v is None for v in calendars.values()):
         log_error("[ERRO] Nenhum calendario foi importado com sucesso")
@@ -168,23 +192,27 @@ def extract_events(calendars: Dict[str, Optional[Calendar]]) -> List[Dict]:
             continue
         
         try:
-            for component in cal.walk():
-                if component.name == "VEVENT":
-                    dtstart = component.get('DTSTART')
-                    dtend = component.get('DTEND')
-                    
-                    event = {
-                        'source': source,
-                        'uid': str(component.get('UID', '')),
-                        'summary': str(component.get('SUMMARY', 'Sem titulo')),
-                        'dtstart': dtstart.dt if dtstart else None,
-                        'dtend': dtend.dt if dtend else None,
-                        'description': str(component.get('DESCRIPTION', '')),
-                        'location': str(component.get('LOCATION', '')),
-                        'component': component,
-                    }
-                    
-                    all_events.append(event)
+            for component in cal.walk('VEVENT'):
+                dtstart = component.get('DTSTART')
+                dtend = component.get('DTEND')
+                start = dtstart.dt if dtstart else None
+                end = dtend.dt if dtend else None
+                
+                # Datas (dia) calculadas uma vez; dedup e import reutilizam-nas
+                event = {
+                    'source': source,
+                    'uid': str(component.get('UID', '')),
+                    'summary': str(component.get('SUMMARY', 'Sem titulo')),
+                    'dtstart': start,
+                    'dtend': end,
+                    'start_date': to_date(start),
+                    'end_date': to_date(end),
+                    'description': str(component.get('DESCRIPTION', '')),
+                    'location': str(component.get('LOCATION', '')),
+                    'component': component,
+                }
+                
+                all_events.append(event)
         
         except Exception as e:
             log_error(f"Error extracting from {source}: {str(e)}")
@@ -201,23 +229,22 @@ def deduplicate_events(events: List[Dict]) -> List[Dict]:
         log_warning("No events to deduplicate")
         return []
     
-    groups = {}
+    # Uma só passagem: por chave fica o evento com a descrição mais longa
+    # (o primeiro em caso de empate), na posição da primeira ocorrência
+    best = {}
     
     for event in events:
         key = (
-            to_date(event['dtstart']),
-            to_date(event['dtend']),
+            event['start_date'],
+            event['end_date'],
             event['summary']
         )
         
-        if key not in groups:
-            groups[key] = []
-        groups[key].append(event)
+        current = best.get(key)
+        if current is None or len(event.get('description', '')) > len(current.get('description', '')):
+            best[key] = event
     
-    deduplicated = []
-    for key, group in groups.items():
-        best = max(group, key=lambda e: len(e.get('description', '')))
-        deduplicated.append(best)
+    deduplicated = list(best.values())
     
     removed = len(events) - len(deduplicated)
     if removed > 0:
@@ -253,15 +280,14 @@ def get_blocked_uids(manual_calendar: Optional[Calendar]) -> Set[str]:
         return blocked_uids
     
     try:
-        for component in manual_calendar.walk():
-            if component.name == "VEVENT":
-                event_class = component.get('CLASS')
-                if event_class and str(event_class).lower() == 'private':
-                    uid = normalize_uid(str(component.get('UID', '')))
-                    if uid:
-                        blocked_uids.add(uid)
-                        summary = str(component.get('SUMMARY', 'evento'))
-                        log_info(f"[MANUAL BLOCK] ⏸️ {summary}")
+        for component in manual_calendar.walk('VEVENT'):
+            event_class = component.get('CLASS')
+            if event_class and str(event_class).lower() == 'private':
+                uid = normalize_uid(str(component.get('UID', '')))
+                if uid:
+                    blocked_uids.add(uid)
+                    summary = str(component.get('SUMMARY', 'evento'))
+                    log_info(f"[MANUAL BLOCK] ⏸️ {summary}")
     
     except Exception as e:
         log_error(f"Error reading manual blocks: {str(e)}")
@@ -271,6 +297,44 @@ def get_blocked_uids(manual_calendar: Optional[Calendar]) -> Set[str]:
     
     return blocked_uids
 
+def load_blocked_uids() -> Set[str]:
+    """
+    UIDs bloqueados do calendário manual, com cache em disco
+
+    Só volta a ler e interpretar o ICS quando o mtime ou o tamanho mudam.
+    """
+    try:
+        st = os.stat(MANUAL_CALENDAR_PATH)
+    except FileNotFoundError:
+        log_info(f"No {MANUAL_CALENDAR_PATH} found")
+        return set()
+    key = [st.st_mtime_ns, st.st_size]
+    
+    try:
+        with open(MANUAL_CACHE_PATH, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('key') == key:
+            blocked_uids = set(cached['blocked_uids'])
+            log_info(f"Loaded {len(blocked_uids)} manual blocks from cache")
+            return blocked_uids
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    
+    manual_cal = load_manual_calendar()
+    blocked_uids = get_blocked_uids(manual_cal)
+    
+    # Só guarda se o calendário foi lido (erro de leitura não fica em cache)
+    if manual_cal is not None:
+        try:
+            tmp_path = MANUAL_CACHE_PATH + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'key': key, 'blocked_uids': sorted(blocked_uids)}, f)
+            os.replace(tmp_path, MANUAL_CACHE_PATH)
+        except OSError as e:
+            log_warning(f"Could not write manual calendar cache: {str(e)}")
+    
+    return blocked_uids
+
 # ============================================================================
 # CREATE CALENDARS
 # ============================================================================
@@ -291,6 +355,8 @@ def create_import_calendar(events: List[Dict]) -> Calendar:
     import_cal.add('x-wr-calname', 'Rental Import Calendar')
     import_cal.add('x-wr-timezone', 'Europe/Lisbon')
     
+    # Um só instante para CREATED/LAST-MODIFIED de todos os eventos gerados
+    stamp = datetime.now(pytz.UTC)
     event_count = 0
     
     for event in events:
@@ -304,8 +370,8 @@ def create_import_calendar(events: List[Dict]) -> Calendar:
             source = event.get('source', 'UNKNOWN')
             uid_base = event.get('uid', '')
             summary = event.get('summary', 'Sem titulo')
-            start_date = to_date(dtstart)
-            end_date = to_date(dtend)
+            start_date = event['start_date']
+            end_date = event['end_date']
             
             # EVENT 1: ORIGINAL RESERVATION
             reserva_event = Event()
@@ -315,8 +381,8 @@ def create_import_calendar(events: List[Dict]) -> Calendar:
             reserva_event.add('dtend', dtend)
             reserva_event.add('description', f"Check-in: {start_date}\nCheck-out: {end_date}")
             reserva_event.add('location', event.get('location', ''))
-            reserva_event.add('created', datetime.now(pytz.UTC))
-            reserva_event.add('last-modified', datetime.now(pytz.UTC))
+            reserva_event.add('created', stamp)
+            reserva_event.add('last-modified', stamp)
             reserva_event.add('status', 'CONFIRMED')
             reserva_event.add('categories', 'RESERVATION-NATIVE')
             reserva_event.add('transp', 'TRANSPARENT')
@@ -326,7 +392,7 @@ def create_import_calendar(events: List[Dict]) -> Calendar:
             
             # EVENT 2: TP ANTES (prep time before)
             tp_before_uid = f"{uid_base}-tp-before"
-            tp_before_start = start_date - timedelta(days=BUFFER_DAYS_BEFORE)
+            tp_before_start = start_date - BUFFER_BEFORE
             tp_before_end = start_date
             
             tp_before_event = Event()
@@ -336,8 +402,8 @@ def create_import_calendar(events: List[Dict]) -> Calendar:
             tp_before_event.add('dtend', tp_before_end)
             tp_before_event.add('description', "Tempo de Preparacao")
             tp_before_event.add('location', event.get('location', ''))
-            tp_before_event.add('created', datetime.now(pytz.UTC))
-            tp_before_event.add('last-modified', datetime.now(pytz.UTC))
+            tp_before_event.add('created', stamp)
+            tp_before_event.add('last-modified', stamp)
             tp_before_event.add('status', 'CONFIRMED')
             tp_before_event.add('transp', 'TRANSPARENT')
             tp_before_event.add('categories', 'PREP-TIME-BEFORE')
@@ -349,7 +415,7 @@ def create_import_calendar(events: List[Dict]) -> Calendar:
             # EVENT 3: TP DEPOIS (prep time after)
             tp_after_uid = f"{uid_base}-tp-after"
             tp_after_start = end_date
-            tp_after_end = end_date + timedelta(days=BUFFER_DAYS_AFTER)
+            tp_after_end = end_date + BUFFER_AFTER
             
             tp_after_event = Event()
             tp_after_event.add('uid', tp_after_uid)
@@ -358,8 +424,8 @@ def create_import_calendar(events: List[Dict]) -> Calendar:
             tp_after_event.add('dtend', tp_after_end)
             tp_after_event.add('description', "Tempo de Preparacao")
             tp_after_event.add('location', event.get('location', ''))
-            tp_after_event.add('created', datetime.now(pytz.UTC))
-            tp_after_event.add('last-modified', datetime.now(pytz.UTC))
+            tp_after_event.add('created', stamp)
+            tp_after_event.add('last-modified', stamp)
             tp_after_event.add('status', 'CONFIRMED')
             tp_after_event.add('transp', 'TRANSPARENT')
             tp_after_event.add('categories', 'PREP-TIME-AFTER')
@@ -390,17 +456,16 @@ def create_master_calendar(import_calendar: Calendar, blocked_uids: Set[str]) ->
     skipped_count = 0
     
     try:
-        for component in import_calendar.walk():
-            if component.name == "VEVENT":
-                uid = normalize_uid(str(component.get('UID', '')))
-                
-                if uid in blocked_uids:
-                    summary = str(component.get('SUMMARY', 'evento'))
-                    log_info(f"[BLOCK] ⏸️ Removing: {summary}")
-                    skipped_count += 1
-                else:
-                    master.add_component(component)
-                    event_count += 1
+        for component in import_calendar.walk('VEVENT'):
+            uid = normalize_uid(str(component.get('UID', '')))
+            
+            if uid in blocked_uids:
+                summary = str(component.get('SUMMARY', 'evento'))
+                log_info(f"[BLOCK] ⏸️ Removing: {summary}")
+                skipped_count += 1
+            else:
+                master.add_component(component)
+                event_count += 1
     
     except Exception as e:
         log_error(f"Error creating master: {str(e)}")
@@ -413,8 +478,14 @@ def export_to_file(calendar: Calendar, filename: str) -> bool:
     try:
         log_info(f"Exporting to {filename}...")
         
-        with open(filename, 'wb') as f:
-            f.write(calendar.to_ical())
+        # Escrita por componente num buffer de 1 MiB, sem montar o ICS
+        # inteiro em memória; o cabeçalho são as propriedades do calendário
+        header = Calendar(calendar).to_ical()[:-len(CALENDAR_FOOTER)]
+        with open(filename, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(header)
+            for component in calendar.subcomponents:
+                f.write(component.to_ical())
+            f.write(CALENDAR_FOOTER)
         
         file_size = os.path.getsize(filename)
         log_success(f"Saved {filename} ({file_size} bytes)")
@@ -454,8 +525,7 @@ def main() -> int:
         events = deduplicate_events(events)
         
         # Load manual calendar
-        manual_cal = load_manual_calendar()
-        blocked_uids = get_blocked_uids(manual_cal)
+        blocked_uids = load_blocked_uids()
         
         # Create import calendar
         import_cal = create_import_calendar(events)
@@ -68,6 +68,16 @@ class CalendarAPI {
         return this.request('/workflow-status');
     }
 
+    /**
+     * SSE: Receber status do workflow sempre que muda (sem polling)
+     * Devolve o EventSource para o chamador poder fazer close()
+     */
+    streamWorkflowStatus(onRun) {
+        const source = new EventSource(`${this.baseUrl}/workflow-stream`);
+        source.onmessage = (event) => onRun(JSON.parse(event.data).run);
+        return source;
+    }
+
     /**
      * GET: Obter histórico de workflows
      */
@@ -75,6 +85,13 @@ class CalendarAPI {
         return this.request(`/workflow-history?limit=${limit}`);
     }
 
+    /**
+     * GET: Último workflow + histórico num só pedido
+     */
+    async getWorkflowOverview(limit = 10) {
+        return this.request(`/workflow-overview?limit=${limit}`);
+    }
+
     /**
      * POST: Disparar workflow
      */
@@ -0,0 +1,112 @@
+"""Testes da app Fase 2 (proxy GitHub Actions)"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('REPO_PATH', tempfile.mkdtemp())
+os.environ.setdefault('GITHUB_TOKEN', 'test-token')
+os.environ.setdefault('GITHUB_REPO', 'owner/repo')
+
+import app_fase2
+
+
+class UnavailableHandler(BaseHTTPRequestHandler):
+    """GitHub simulado que responde sempre 503"""
+
+    requests_seen = 0
+
+    def do_GET(self):
+        UnavailableHandler.requests_seen += 1
+        body = b'{"message":"Service Unavailable"}'
+        self.send_response(503)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class DispatchHandler(BaseHTTPRequestHandler):
+    """GitHub simulado para o POST de dispatch (status configurável)"""
+
+    status = 204
+    payload = None
+
+    def do_POST(self):
+        DispatchHandler.payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.send_response(self.status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(handler, monkeypatch):
+    """Servidor local com o adapter https:// da sessão GitHub também em http://"""
+    server = HTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setitem(app_fase2.gh_session.adapters, 'http://', app_fase2.gh_session.get_adapter('https://'))
+    return server
+
+
+def logged_in_client():
+    client = app_fase2.app.test_client()
+    client.post('/login', json={'username': app_fase2.WEB_USERNAME, 'password': app_fase2.WEB_PASSWORD})
+    return client
+
+
+def test_upstream_503_keeps_its_status_after_retries(monkeypatch):
+    server = start_server(UnavailableHandler, monkeypatch)
+    try:
+        monkeypatch.setattr(app_fase2, 'GITHUB_LATEST_RUN_URL', f'http://127.0.0.1:{server.server_port}/runs?per_page=1')
+        app_fase2._local_cache.clear()
+        UnavailableHandler.requests_seen = 0
+
+        response = logged_in_client().get('/api/workflow-status')
+
+        assert response.status_code == 503
+        assert response.get_json()['status'] == 503
+        assert UnavailableHandler.requests_seen == 4  # pedido inicial + 3 tentativas
+    finally:
+        server.shutdown()
+
+
+def test_trigger_without_redis_keeps_json_error_shape(monkeypatch):
+    server = start_server(DispatchHandler, monkeypatch)
+    try:
+        monkeypatch.setattr(app_fase2, 'GITHUB_DISPATCH_URL', f'http://127.0.0.1:{server.server_port}/dispatches')
+        monkeypatch.setattr(DispatchHandler, 'status', 401)
+
+        response = logged_in_client().post('/api/trigger-workflow')
+
+        assert response.status_code == 401
+        assert response.get_json() == {'error': 'GitHub token inválido', 'status': 401}
+    finally:
+        server.shutdown()
+
+
+def test_trigger_without_redis_reuses_request_timestamp(monkeypatch):
+    server = start_server(DispatchHandler, monkeypatch)
+    try:
+        monkeypatch.setattr(app_fase2, 'GITHUB_DISPATCH_URL', f'http://127.0.0.1:{server.server_port}/dispatches')
+        monkeypatch.setattr(DispatchHandler, 'status', 204)
+
+        response = logged_in_client().post('/api/trigger-workflow')
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert data['status'] == 'success'
+        assert data['message'] == 'Workflow disparado com sucesso'
+        assert data['timestamp'] == DispatchHandler.payload['inputs']['timestamp']
+        assert DispatchHandler.payload['inputs']['triggered_by'] == app_fase2.WEB_USERNAME
+    finally:
+        server.shutdown()
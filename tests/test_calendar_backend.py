@@ -0,0 +1,72 @@
+"""Testes da cache de eventos e dos GET condicionais (calendar_backend)"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('REPO_PATH', tempfile.mkdtemp())
+
+import calendar_backend
+
+
+def write_calendar(path, uids, mtime_ns):
+    """Escrever um ICS com um VEVENT por UID e fixar o mtime"""
+    events = ''.join(f'BEGIN:VEVENT\r\nUID:{uid}\r\nSUMMARY:{uid}\r\nEND:VEVENT\r\n' for uid in uids)
+    path.write_bytes(f'BEGIN:VCALENDAR\r\n{events}END:VCALENDAR\r\n'.encode('utf-8'))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def logged_in_client():
+    client = calendar_backend.app.test_client()
+    client.post('/login', data={'username': calendar_backend.ADMIN_USERNAME,
+                                'password': calendar_backend.ADMIN_PASSWORD})
+    return client
+
+
+def uids(response):
+    return [event['uid'] for event in response.get_json()['events']]
+
+
+def test_changed_mtime_or_size_invalidates_cached_events(tmp_path, monkeypatch):
+    path = tmp_path / 'master_calendar.ics'
+    monkeypatch.setattr(calendar_backend, 'MASTER_CALENDAR_PATH', str(path))
+    client = logged_in_client()
+
+    write_calendar(path, ['aa'], 1_000_000_000_000_000_000)
+    assert uids(client.get('/api/calendar/master')) == ['aa']
+    assert str(path) in calendar_backend._EVENTS_JSON_CACHE
+
+    # Mesmo tamanho, mtime diferente
+    write_calendar(path, ['bb'], 1_000_000_000_000_000_001)
+    assert uids(client.get('/api/calendar/master')) == ['bb']
+
+    # Mesmo mtime, tamanho diferente
+    write_calendar(path, ['bb', 'cc'], 1_000_000_000_000_000_001)
+    response = client.get('/api/calendar/master')
+    assert uids(response) == ['bb', 'cc']
+    assert response.get_json()['count'] == 2
+
+
+def test_matching_if_none_match_returns_304(tmp_path, monkeypatch):
+    path = tmp_path / 'master_calendar.ics'
+    monkeypatch.setattr(calendar_backend, 'MASTER_CALENDAR_PATH', str(path))
+    client = logged_in_client()
+
+    write_calendar(path, ['aa'], 1_000_000_000_000_000_000)
+    first = client.get('/api/calendar/master')
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    cached = client.get('/api/calendar/master', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == etag
+    assert cached.headers['Cache-Control'] == 'no-cache'
+
+    write_calendar(path, ['aa', 'bb'], 1_000_000_000_000_000_002)
+    changed = client.get('/api/calendar/master', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert uids(changed) == ['aa', 'bb']
@@ -0,0 +1,43 @@
+"""Testes do serializador ICS partilhado (calendar_common)"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calendar_common import format_manual_event, ics_escape, ics_unescape
+
+
+def content_lines(block):
+    """Linhas lógicas de um bloco ICS (desfaz o folding)"""
+    return block.replace(b'\r\n ', b'').decode('utf-8').split('\r\n')[:-1]
+
+
+def test_line_breaks_in_text_fields_cannot_inject_properties():
+    event = {
+        'uid': 'x\r\nEND:VEVENT\r\nBEGIN:VEVENT\r\nSUMMARY:evil',
+        'status': 'CONFIRMED\rX-EVIL:1',
+        'summary': 'a\nb',
+        'description': 'c\r\nd',
+        'categories': 'e\rf',
+        'dtstart': '2026-01-01',
+    }
+    lines = content_lines(format_manual_event(event, '20260101T000000'))
+
+    assert lines[0] == 'BEGIN:VEVENT'
+    assert lines[-1] == 'END:VEVENT'
+    assert lines.count('BEGIN:VEVENT') == 1
+    assert lines.count('END:VEVENT') == 1
+    assert not any(line.startswith('X-EVIL') for line in lines)
+    assert 'UID:x\\nEND:VEVENT\\nBEGIN:VEVENT\\nSUMMARY:evil' in lines
+    assert 'STATUS:CONFIRMED\\nX-EVIL:1' in lines
+
+
+def test_escape_round_trip():
+    value = 'a,b;c\\d\ne'
+    assert ics_unescape(ics_escape(value)) == value
+
+
+def test_long_lines_are_folded_at_75_octets():
+    block = format_manual_event({'summary': 'é' * 100}, '20260101T000000')
+    assert all(len(line) <= 75 for line in block.split(b'\r\n'))
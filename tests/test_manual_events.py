@@ -0,0 +1,169 @@
+"""Testes do gestor de eventos manuais (scripts/manual_events.py)"""
+
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from manual_events import ManualCalendarManager, _event_date, new_event_id
+
+
+def content_lines(data):
+    """Linhas lógicas de um ICS (desfaz o folding)"""
+    return data.replace(b'\r\n ', b'').decode('utf-8').split('\r\n')[:-1]
+
+
+def test_ics_lone_carriage_return_cannot_inject_properties(tmp_path):
+    manager = ManualCalendarManager(str(tmp_path))
+    manager.events = [{
+        'id': 'abc\rX-EVIL-UID:1',
+        'type': 'BLOCK_DATE',
+        'title': 'x\rX-EVIL-SUMMARY:1',
+        'description': 'y\rEND:VEVENT',
+        'date_start': '2026-01-01T00:00:00',
+    }]
+    lines = content_lines(manager._ics_bytes())
+
+    assert not any(line.startswith('X-EVIL') for line in lines)
+    assert lines.count('BEGIN:VEVENT') == 1
+    assert lines.count('END:VEVENT') == 1
+    assert 'UID:abc\\nX-EVIL-UID:1' in lines
+    assert 'DESCRIPTION:y\\nEND:VEVENT' in lines
+
+
+# ============================================================================
+# get_events_by_date (DateIndex) contra a pesquisa linear
+# ============================================================================
+
+def linear_events_by_date(events, target):
+    """Referência: a pesquisa linear que o DateIndex substituiu"""
+    matching = []
+    for event in events:
+        start = _event_date(event.get('date_start'))
+        if start is None:
+            continue
+        end = _event_date(event.get('date_end'))
+        if start == target and event['type'] == 'BLOCK_DATE':
+            matching.append(event)
+        elif end is not None and start <= target <= end:
+            matching.append(event)
+    return matching
+
+
+def event(event_id, event_type, start, end=None):
+    data = {'id': event_id, 'type': event_type, 'title': event_id}
+    if start is not None:
+        data['date_start'] = start
+    if end is not None:
+        data['date_end'] = end
+    return data
+
+
+FIXED_EVENTS = [
+    event('overlap-a', 'REMOVE_DATE', '2026-03-01T00:00:00', '2026-03-10T00:00:00'),
+    event('overlap-b', 'HIDE_EVENT', '2026-03-05T12:00:00', '2026-03-15T00:00:00'),
+    event('outer', 'FORCE_AVAILABILITY', '2026-02-20T00:00:00', '2026-04-30T00:00:00'),
+    event('nested', 'REMOVE_DATE', '2026-03-07T00:00:00', '2026-03-08T00:00:00'),
+    event('block-day', 'BLOCK_DATE', '2026-03-20T09:00:00'),
+    event('block-range', 'BLOCK_DATE', '2026-03-20T00:00:00', '2026-03-22T00:00:00'),
+    event('hide-no-end', 'HIDE_EVENT', '2026-03-20T00:00:00'),
+    event('same-day', 'REMOVE_DATE', '2026-03-25T08:00:00', '2026-03-25T18:00:00'),
+    event('end-before-start', 'REMOVE_DATE', '2026-03-12T00:00:00', '2026-03-11T00:00:00'),
+    event('bad-start', 'BLOCK_DATE', 'not-a-date', '2026-03-10T00:00:00'),
+    event('bad-end', 'REMOVE_DATE', '2026-03-02T00:00:00', '31/03/2026'),
+    event('empty-start', 'BLOCK_DATE', ''),
+    event('no-dates', 'BLOCK_DATE', None),
+    event('early', 'REMOVE_DATE', '2026-01-01T00:00:00', '2026-01-02T00:00:00'),
+    event('lone-block', 'BLOCK_DATE', '2026-05-05T00:00:00'),  # nenhum intervalo chega a esta data
+]
+
+
+def random_events(rng, count):
+    types = ['BLOCK_DATE', 'HIDE_EVENT', 'REMOVE_DATE', 'FORCE_AVAILABILITY']
+    events = []
+    for i in range(count):
+        start = date(2026, 1, 1) + timedelta(days=rng.randrange(90))
+        roll = rng.random()
+        if roll < 0.2:
+            end = None
+        elif roll < 0.25:
+            end = 'invalid'
+        else:
+            end = (start + timedelta(days=rng.randrange(-2, 20))).isoformat() + 'T00:00:00'
+        start_value = 'invalid' if rng.random() < 0.05 else start.isoformat() + 'T10:00:00'
+        events.append(event(f'e{i}', rng.choice(types), start_value, end))
+    return events
+
+
+def assert_matches_linear_scan(tmp_path, events):
+    manager = ManualCalendarManager(str(tmp_path))
+    manager.events = events
+    manager._dates = None
+
+    day = date(2025, 12, 25)
+    while day <= date(2026, 5, 10):
+        expected = [e['id'] for e in linear_events_by_date(events, day)]
+        found = [e['id'] for e in manager.get_events_by_date(day.isoformat())]
+        assert found == expected, day
+        day += timedelta(days=1)
+
+
+def test_get_events_by_date_matches_linear_scan_for_edge_cases(tmp_path):
+    assert_matches_linear_scan(tmp_path, FIXED_EVENTS)
+
+
+def test_get_events_by_date_matches_linear_scan_for_random_events(tmp_path):
+    rng = random.Random(1234)
+    for _ in range(5):
+        assert_matches_linear_scan(tmp_path, random_events(rng, 200))
+
+
+def test_get_events_by_date_edge_cases(tmp_path):
+    manager = ManualCalendarManager(str(tmp_path))
+    manager.events = FIXED_EVENTS
+    manager._dates = None
+
+    def ids(target):
+        return {e['id'] for e in manager.get_events_by_date(target)}
+
+    assert ids('2026-03-07') == {'overlap-a', 'overlap-b', 'outer', 'nested'}
+    assert ids('2026-03-20') == {'outer', 'block-day', 'block-range'}
+    assert ids('2026-03-21') == {'outer', 'block-range'}
+    assert ids('2026-03-25') == {'outer', 'same-day'}
+    assert ids('2026-03-11') == {'overlap-b', 'outer'}
+    assert ids('2026-01-15') == set()
+    assert ids('2026-05-05') == {'lone-block'}
+
+
+# ============================================================================
+# new_event_id (UUIDv7)
+# ============================================================================
+
+def test_new_event_id_sets_version_and_variant_bits():
+    for _ in range(1000):  # atravessa várias recargas do bloco de aleatoriedade
+        value = uuid.UUID(new_event_id())
+        assert value.version == 7
+        assert value.variant == uuid.RFC_4122
+
+
+def test_new_event_id_embeds_timestamp_and_orders_by_creation():
+    before = time.time_ns() // 1_000_000
+    ids = []
+    for _ in range(5):
+        ids.append(new_event_id())
+        time.sleep(0.002)
+    after = time.time_ns() // 1_000_000
+
+    stamps = [uuid.UUID(value).int >> 80 for value in ids]
+    assert all(before <= stamp <= after for stamp in stamps)
+    assert stamps == sorted(stamps)
+    assert ids == sorted(ids)
+
+
+def test_new_event_id_is_unique():
+    ids = [new_event_id() for _ in range(5000)]
+    assert len(set(ids)) == len(ids)
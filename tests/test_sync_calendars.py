@@ -0,0 +1,71 @@
+"""Testes do script de sincronização (scripts/sync_calendars.py)"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+os.environ.setdefault('REPO_PATH', tempfile.mkdtemp())
+
+from sync_calendars import deduplicate_events
+
+
+def feed_event(name, summary='Reserved', start='2026-03-01', end='2026-03-05', description=None):
+    event = {'name': name, 'start_date': start, 'end_date': end, 'summary': summary}
+    if description is not None:
+        event['description'] = description
+    return event
+
+
+def names(events):
+    return [event['name'] for event in events]
+
+
+def test_longest_description_wins():
+    events = [
+        feed_event('short', description='a'),
+        feed_event('none'),
+        feed_event('long', description='abc'),
+        feed_event('medium', description='ab'),
+    ]
+    assert names(deduplicate_events(events)) == ['long']
+
+
+def test_first_event_wins_ties():
+    events = [
+        feed_event('first', description='xy'),
+        feed_event('second', description='zw'),
+        feed_event('no-description-1'),
+    ]
+    assert names(deduplicate_events(events)) == ['first']
+
+    events = [feed_event('first'), feed_event('second'), feed_event('third', description='')]
+    assert names(deduplicate_events(events)) == ['first']
+
+
+def test_keeps_first_occurrence_order():
+    events = [
+        feed_event('b1', summary='B'),
+        feed_event('a1', summary='A'),
+        feed_event('b2', summary='B', description='longer'),
+        feed_event('c1', summary='C'),
+        feed_event('a2', summary='A', description='x'),
+        feed_event('d1', summary='A', start='2026-04-01'),
+    ]
+    # Cada chave fica na posição da primeira ocorrência, com o melhor evento
+    assert names(deduplicate_events(events)) == ['b2', 'a2', 'c1', 'd1']
+
+
+def test_key_is_start_end_and_summary():
+    events = [
+        feed_event('base'),
+        feed_event('other-start', start='2026-02-28'),
+        feed_event('other-end', end='2026-03-06'),
+        feed_event('other-summary', summary='Blocked'),
+    ]
+    assert names(deduplicate_events(events)) == ['base', 'other-start', 'other-end', 'other-summary']
+
+
+def test_empty_input():
+    assert deduplicate_events([]) == []